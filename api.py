@@ -0,0 +1,255 @@
+"""API HTTP (ASGI) para sistemas parceiros, sem passar pelo dashboard.
+
+Uso:
+    python api.py --porta 8000 --processos 4
+    python api.py --porta 8000 --workers 4    # vários processos servindo HTTP
+
+Rotas:
+    POST /demonstrativos          PDF no corpo (application/pdf) ou em multipart (campo "arquivo");
+                                  ?motor=pdfium escolhe o motor de extração. Devolve nome, CPF, ano,
+                                  dados_mensais e totais.
+    GET  /demonstrativos/{chave}  Demonstrativo já extraído, pelo hash SHA-256 do PDF.
+    POST /simulacao               JSON com receita_mensal, despesas_consultorio e, opcionais,
+                                  despesas_pessoais, ano e otimizar_prolabore. Os valores podem ser
+                                  números ou listas (um cenário por posição). Devolve o comparativo PF x PJ.
+    GET  /metricas                Métricas no formato texto do Prometheus (tempo por etapa, caches, memória).
+    GET  /saude
+
+A extração roda em um pool de processos; o resultado fica no cache em memória e
+no armazém SQLite, por hash do conteúdo, então reenviar o mesmo PDF não extrai de
+novo (e envios simultâneos do mesmo PDF esperam a mesma extração). A simulação
+é vetorizada e roda direto no event loop, que é mais barato do que despachá-la.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from cache import CACHE_DEMONSTRATIVOS, hash_conteudo
+from demonstrativo import MOTOR_PADRAO, MOTORES, ler_demonstrativo
+from ingestao import LIMITE_ARQUIVO, MB
+from metricas import REGISTRO, cronometrar
+from persistencia import armazem_padrao
+from simulacao import comparar_pf_pj, otimizar_prolabore
+from tributos import TABELAS_IR
+
+MAX_CENARIOS = 100_000
+KEEP_ALIVE = 30
+
+_extracoes = {}
+
+
+class MuitosCenarios(ValueError):
+    pass
+
+
+def _novo_pool():
+    # forkserver: os filhos não herdam as threads do servidor; reciclados a cada 500 PDFs
+    processos = int(os.environ.get("CARNELEAO_API_PROCESSOS", os.cpu_count() or 1))
+    contexto = multiprocessing.get_context("forkserver")
+    return ProcessPoolExecutor(max_workers=processos, mp_context=contexto, max_tasks_per_child=500)
+
+
+def _substituir_pool(app, quebrado):
+    """Troca o pool em que um processo morreu; pedidos simultâneos que viram o mesmo pool quebrado trocam uma vez só."""
+    if app.state.pool is quebrado:
+        app.state.pool = _novo_pool()
+        quebrado.shutdown(wait=False, cancel_futures=True)
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(app):
+    app.state.pool = _novo_pool()
+    try:
+        yield
+    finally:
+        app.state.pool.shutdown(cancel_futures=True)
+
+
+def _erro(status, mensagem):
+    return JSONResponse({"erro": mensagem}, status_code=status)
+
+
+def _como_json(chave, demonstrativo):
+    return {"chave": chave, **demonstrativo.como_dict(), "totais": demonstrativo.totais()}
+
+
+def _consultar(chave):
+    demonstrativo = CACHE_DEMONSTRATIVOS.obter(chave)
+    if demonstrativo is None:
+        demonstrativo = armazem_padrao().obter(chave)
+        if demonstrativo is not None:
+            CACHE_DEMONSTRATIVOS.guardar(chave, demonstrativo)
+    return demonstrativo
+
+
+async def _extrair(pool, chave, conteudo, motor):
+    """Extrai no pool de processos; pedidos simultâneos com o mesmo conteúdo aguardam a mesma extração."""
+    andamento = _extracoes.get(chave)
+    if andamento is None:
+        # O registro de métricas é por processo; a extração é cronometrada daqui, incluindo a ida ao pool
+        andamento = asyncio.get_running_loop().run_in_executor(pool, ler_demonstrativo, conteudo, motor)
+        _extracoes[chave] = andamento
+        andamento.add_done_callback(lambda _: _extracoes.pop(chave, None))
+    with cronometrar("api_extracao", motor=motor or MOTOR_PADRAO):
+        demonstrativo = await asyncio.shield(andamento)
+    CACHE_DEMONSTRATIVOS.guardar(chave, demonstrativo)
+    await run_in_threadpool(armazem_padrao().guardar, chave, demonstrativo)
+    return demonstrativo
+
+
+async def enviar_demonstrativo(request):
+    motor = request.query_params.get("motor")
+    if motor is not None and motor not in MOTORES:
+        return _erro(400, f"Motor desconhecido: {motor!r} (opções: {', '.join(MOTORES)})")
+    try:
+        tamanho = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        return _erro(400, "Cabeçalho Content-Length inválido")
+    if tamanho > LIMITE_ARQUIVO:
+        return _erro(413, f"PDF passa do limite de {LIMITE_ARQUIVO // MB} MB")
+
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        async with request.form(max_files=1, max_part_size=LIMITE_ARQUIVO) as formulario:
+            arquivo = formulario.get("arquivo")
+            if arquivo is None or isinstance(arquivo, str):
+                return _erro(400, 'Envie o PDF no campo "arquivo"')
+            conteudo = await arquivo.read()
+    else:
+        conteudo = await request.body()
+    if not conteudo:
+        return _erro(400, "Corpo vazio; envie o PDF")
+    if len(conteudo) > LIMITE_ARQUIVO:
+        return _erro(413, f"PDF passa do limite de {LIMITE_ARQUIVO // MB} MB")
+
+    chave = hash_conteudo(conteudo)
+    demonstrativo = await run_in_threadpool(_consultar, chave)
+    if demonstrativo is None:
+        pool = request.app.state.pool
+        try:
+            demonstrativo = await _extrair(pool, chave, conteudo, motor)
+        except BrokenProcessPool:
+            # Um processo de extração morreu (ex.: sem memória): o pool não aceita mais tarefas
+            _substituir_pool(request.app, pool)
+            return _erro(503, "Extração indisponível no momento; tente novamente")
+        except Exception as e:
+            return _erro(422, f"Não foi possível ler o demonstrativo: {type(e).__name__}: {e}")
+    return JSONResponse(_como_json(chave, demonstrativo))
+
+
+async def obter_demonstrativo(request):
+    chave = request.path_params["chave"]
+    demonstrativo = await run_in_threadpool(_consultar, chave)
+    if demonstrativo is None:
+        return _erro(404, "Demonstrativo não encontrado")
+    return JSONResponse(_como_json(chave, demonstrativo))
+
+
+def _numeros(dados, nome, padrao=None):
+    try:
+        valores = np.asarray(dados.get(nome, padrao), dtype=np.float64)
+    except OverflowError:
+        raise ValueError(f"{nome} fora do intervalo numérico") from None
+    # null vira NaN na conversão; NaN e infinito não voltam como JSON válido
+    if not np.isfinite(valores).all():
+        raise ValueError(f"{nome} deve conter apenas números finitos")
+    return valores
+
+
+def _simular(dados):
+    ano = dados.get("ano")
+    if ano is not None and (type(ano) is not int or ano not in TABELAS_IR):
+        raise ValueError(f"ano deve ser um dos anos com tabela do IR ({', '.join(map(str, TABELAS_IR))})")
+    receita_mensal = _numeros(dados, "receita_mensal")
+    despesas_consultorio = _numeros(dados, "despesas_consultorio")
+    despesas_pessoais = _numeros(dados, "despesas_pessoais", 0.0)
+    if max(receita_mensal.size, despesas_consultorio.size, despesas_pessoais.size) > MAX_CENARIOS:
+        raise MuitosCenarios(f"No máximo {MAX_CENARIOS} cenários por requisição")
+
+    # Escalares seguem como escalares, para a resposta vir com números e não listas
+    entradas = [x.item() if x.ndim == 0 else x for x in (receita_mensal, despesas_consultorio, despesas_pessoais)]
+    resultado = comparar_pf_pj(*entradas, ano=dados.get("ano"))
+    if dados.get("otimizar_prolabore"):
+        otimo = otimizar_prolabore(entradas[0], entradas[2], ano=dados.get("ano"))
+        resultado["prolabore_otimo"] = otimo["prolabore"]
+        resultado["custo_total_pj_otimo"] = otimo["custo_total_pj"]
+        resultado["economia_anual_vs_padrao"] = otimo["economia_anual_vs_padrao"]
+    # Entradas finitas mas extremas (ex.: 1e308) estouram nas contas
+    numericos = (np.asarray(valor) for valor in resultado.values())
+    if not all(np.isfinite(valor).all() for valor in numericos if valor.dtype.kind == "f"):
+        raise ValueError("valores grandes demais para a simulação")
+    return {chave: valor.tolist() if isinstance(valor, np.ndarray) else valor for chave, valor in resultado.items()}
+
+
+async def simular(request):
+    try:
+        dados = await request.json()
+    except ValueError:
+        return _erro(400, "Corpo não é um JSON válido")
+    if not isinstance(dados, dict) or "receita_mensal" not in dados or "despesas_consultorio" not in dados:
+        return _erro(400, "Informe receita_mensal e despesas_consultorio")
+    try:
+        # Lotes grandes saem do event loop para não atrasar as outras requisições
+        grande = np.size(dados["receita_mensal"]) > 1000 or np.size(dados.get("despesas_pessoais", 0.0)) > 1000
+        with cronometrar("api_simulacao"):
+            resultado = await run_in_threadpool(_simular, dados) if grande else _simular(dados)
+    except MuitosCenarios as e:
+        return _erro(413, str(e))
+    except (TypeError, ValueError) as e:
+        return _erro(400, f"Entrada inválida: {e}")
+    return JSONResponse(resultado)
+
+
+async def metricas(request):
+    return PlainTextResponse(REGISTRO.texto(), media_type="text/plain; version=0.0.4")
+
+
+async def saude(request):
+    return JSONResponse({"ok": True})
+
+
+app = Starlette(
+    routes=[
+        Route("/demonstrativos", enviar_demonstrativo, methods=["POST"]),
+        Route("/demonstrativos/{chave}", obter_demonstrativo, methods=["GET"]),
+        Route("/simulacao", simular, methods=["POST"]),
+        Route("/metricas", metricas, methods=["GET"]),
+        Route("/saude", saude, methods=["GET"]),
+    ],
+    lifespan=_ciclo_de_vida,
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="API HTTP do Carnê-Leão.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="processos servindo HTTP (cada um com seu pool de extração)")
+    parser.add_argument("--processos", type=int, default=None, help="processos de extração por worker (padrão: número de núcleos)")
+    args = parser.parse_args(argv)
+
+    if args.processos:
+        os.environ["CARNELEAO_API_PROCESSOS"] = str(args.processos)
+    uvicorn.run(
+        "api:app" if args.workers > 1 else app,
+        host=args.host,
+        port=args.porta,
+        workers=args.workers,
+        timeout_keep_alive=KEEP_ALIVE,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,28 @@
+import time
+
 import streamlit as st
-import pdfplumber
-import re
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-from PIL import Image
-import os
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-
-# === IDENTIDADE VISUAL ===
-COR_PRIMARIA = "#0b485a"
-COR_SECUNDARIA = "#01b7e9"
-COR_DESTAQUE = "#e59500"
+from cache import CACHE_DEMONSTRATIVOS, CACHE_MONTE_CARLO, CACHE_SENSIBILIDADE, CACHES, MB, cache_da_sessao
+from estaticos import COR_DESTAQUE, COR_PRIMARIA, COR_SECUNDARIA, ESTILO_CSS, carregar_logo, formatar_reais
+from metricas import REGISTRO, cronometrar, iniciar_execucao, registrar_payload, servir_se_configurado
 
 st.set_page_config(page_title="Carnê-Leão | Declara Psi", layout="centered")
 
+# Etapas cronometradas neste rerun; com ?debug=1 aparecem no painel ao fim da página
+inicio_execucao = time.perf_counter()
+etapas = iniciar_execucao()
+etapas_tarefa = []
+servir_se_configurado()
+
 # === ESTILO PARA IMPRESSÃO ===
-st.markdown("""
-    <style>
-        @media print {
-            body {
-                -webkit-print-color-adjust: exact;
-            }
-            .element-container { 
-                page-break-inside: avoid; 
-            }
-        }
-        .spacer-below-filter {
-            margin-bottom: 60px;
-        }
-        .resumo-margin-top {
-            margin-top: 30px;
-        }
-    </style>
-""", unsafe_allow_html=True)
+st.markdown(ESTILO_CSS, unsafe_allow_html=True)
 
 # === TOPO COM LOGO E TÍTULO ===
 col_logo, col_titulo = st.columns([1, 6])
 with col_logo:
-    try:
-        caminho_logo = os.path.join(os.path.dirname(__file__), "logo.png")
-        logo = Image.open(caminho_logo)
+    logo = carregar_logo()
+    if logo:
         st.image(logo, width=90)
-    except:
+    else:
         st.warning("Logo não encontrada.")
 
 with col_titulo:
@@ -56,95 +36,171 @@ with col_titulo:
 st.markdown("<hr style='border:1px solid #ccc'>", unsafe_allow_html=True)
 
 # === UPLOAD PDF ===
-meses = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
-arquivo = st.file_uploader("📄 Envie o demonstrativo em PDF", type=["pdf"])
-
-if arquivo:
+arquivos = st.file_uploader("📄 Envie o demonstrativo em PDF (um ou mais anos, ou um ZIP com vários)", type=["pdf", "zip"], accept_multiple_files=True)
+cpf_consulta = "" if arquivos else st.text_input("🔎 ...ou consulte pelo CPF um cliente já analisado", placeholder="000.000.000-00").strip()
+
+if arquivos or cpf_consulta:
+    # Dependências pesadas só são carregadas quando há um PDF para analisar;
+    # nos reruns seguintes os módulos já estão em sys.modules
+    import numpy as np
+    import plotly.graph_objects as go
+    from auditoria import auditar, problemas
+    from demonstrativo import MESES
+    from especificacoes import FORMATO_GRAFICOS, tamanho, vega_aliquota, vega_comparativo, vega_historico, vega_valores
+    if FORMATO_GRAFICOS == "png":
+        from graficos import grafico_aliquota, grafico_comparativo, grafico_historico, grafico_valores
+    from ingestao import processar_envio
+    from persistencia import armazem_padrao, normalizar_cpf
+    from simulacao import comparar_pf_pj, otimizar_prolabore, simular_monte_carlo, varrer_sensibilidade
+    from tarefas import FILA, FilaCheia
+    from tributos import TABELAS_IR
+
+    def exibir_grafico(nome, especificacao, png):
+        """Vega-Lite, desenhado no navegador, ou PNG, conforme CARNELEAO_GRAFICOS; registra os bytes enviados."""
+        with cronometrar("exibir_grafico", grafico=nome, formato=FORMATO_GRAFICOS):
+            if FORMATO_GRAFICOS == "png":
+                conteudo = png()
+                st.image(conteudo, width="stretch")
+                enviados = len(conteudo)
+            else:
+                conteudo = especificacao()
+                st.vega_lite_chart(conteudo, width="stretch")
+                enviados = tamanho(conteudo)
+        registrar_payload(nome, FORMATO_GRAFICOS, enviados)
+
+    def exibir_plotly(nome, figura):
+        with cronometrar("exibir_grafico", grafico=nome, formato="plotly"):
+            st.plotly_chart(figura)
+        registrar_payload(nome, "plotly", len(figura.to_json()))
+
+    meses = MESES
     try:
-        with pdfplumber.open(arquivo) as pdf:
-            texto = pdf.pages[0].extract_text()
-
-        dados_extraidos = {"nome": None, "cpf": None, "rendimentos_total": [], "deducao_considerada": [], "imposto_devido_I": []}
-
-        nome_match = re.search(r"NOME:\s+(.*?)\s+DEMONSTRATIVO", texto)
-        cpf_match = re.search(r"CPF:\s+([\d\.]+-\d+)", texto)
-        rendimentos_match = re.search(r"Total\s+([\d\.,\s]+)\s+Deduções", texto)
-        deducao_match = re.search(r"Dedução Considerada\s+([\d\.,\s]+)\s+Cálculo", texto)
-        imposto_match = re.search(r"Imposto Devido I\s+([\d\.,\s]+)\s+Imposto Pago", texto)
-
-        if nome_match: dados_extraidos["nome"] = nome_match.group(1)
-        if cpf_match: dados_extraidos["cpf"] = cpf_match.group(1)
-        if rendimentos_match:
-            dados_extraidos["rendimentos_total"] = [val.replace(".", "").replace(",", ".") for val in rendimentos_match.group(1).split()]
-        if deducao_match:
-            dados_extraidos["deducao_considerada"] = [val.replace(".", "").replace(",", ".") for val in deducao_match.group(1).split()]
-        if imposto_match:
-            dados_extraidos["imposto_devido_I"] = [val.replace(".", "").replace(",", ".") for val in imposto_match.group(1).split()]
-
-        dados_mensais = {}
-        for i in range(12):
-            rendimento = float(dados_extraidos["rendimentos_total"][i])
-            deducao = float(dados_extraidos["deducao_considerada"][i])
-            imposto = float(dados_extraidos["imposto_devido_I"][i])
-            aliquota = round((imposto / rendimento) * 100, 2) if rendimento > 0 else 0.0
-
-            dados_mensais[meses[i]] = {
-                "rendimento": rendimento,
-                "deducao": deducao,
-                "imposto": imposto,
-                "aliquota": aliquota
+        # Reruns reaproveitam o cache em memória; um arquivo já enviado em outra sessão vem do
+        # armazém em disco, e só um PDF inédito é de fato extraído (e gravado para a próxima vez)
+        armazem = armazem_padrao()
+        demonstrativos = {}
+        recusados = []
+        if arquivos:
+            # A extração roda na fila de tarefas; envios pequenos terminam dentro da espera curta e
+            # aparecem direto, os maiores mostram o progresso sem prender a sessão
+            try:
+                id_tarefa = FILA.enviar(
+                    processar_envio,
+                    arquivos,
+                    lambda chave, ler: CACHE_DEMONSTRATIVOS.obter_ou_calcular(chave, lambda: armazem.obter_ou_ler(chave, ler)),
+                    chave=tuple(arquivo.file_id for arquivo in arquivos),
+                )
+            except FilaCheia:
+                st.warning("⏳ Muitos arquivos sendo processados agora. Tente novamente em instantes.")
+                st.stop()
+            tarefa = FILA.estado(id_tarefa)
+            if not tarefa.aguardar(timeout=0.3):
+
+                @st.fragment(run_every=0.5)
+                def acompanhar_tarefa():
+                    if FILA.estado(id_tarefa).terminada:
+                        st.rerun()
+                    st.progress(tarefa.fracao, text=f"Processando {tarefa.feito} de {tarefa.total or '?'} arquivo(s)...")
+
+                acompanhar_tarefa()
+                st.stop()
+            etapas_tarefa = tarefa.etapas
+            if tarefa.estado == "falhou":
+                raise RuntimeError(tarefa.erro)
+
+            for nome, chave, demonstrativo, erro in tarefa.resultado:
+                if erro:
+                    recusados.append(f"{nome}: {erro}")
+                else:
+                    demonstrativos[chave] = (nome, demonstrativo)
+        if recusados:
+            with st.expander(f"⚠️ {len(recusados)} arquivo(s) não processado(s)"):
+                st.markdown("\n".join(f"- {recusado}" for recusado in recusados))
+
+        # Histórico por CPF na sessão, semeado com os anos já armazenados; cada ano enviado entra uma
+        # vez e só os anos novos atualizam os agregados. Fica no cache da sessão, dentro do orçamento
+        # de memória: um histórico descartado é refeito do armazém, onde todo envio já foi gravado
+        memoria_sessao = st.session_state.setdefault("memoria", cache_da_sessao())
+        cpfs = {normalizar_cpf(cpf_consulta)} if cpf_consulta else {demonstrativo.cpf for _, demonstrativo in demonstrativos.values()}
+        historicos = {cpf: memoria_sessao.obter_ou_calcular(("historico", cpf), lambda: armazem.historico(cpf)) for cpf in cpfs}
+        for chave, (_, demonstrativo) in demonstrativos.items():
+            if demonstrativo.ano is not None:
+                historicos[demonstrativo.cpf].adicionar(demonstrativo, chave)
+        for cpf, historico in historicos.items():
+            memoria_sessao.guardar(("historico", cpf), historico)
+
+        # Anos já armazenados do cliente também podem ser abertos, sem reenviar o PDF
+        for cpf in cpfs:
+            for chave in historicos[cpf].chaves:
+                if chave not in demonstrativos:
+                    demonstrativos[chave] = ("salvo", CACHE_DEMONSTRATIVOS.obter_ou_calcular(chave, lambda: armazem.obter(chave)))
+        if not demonstrativos:
+            st.warning("Nenhum demonstrativo armazenado para esse CPF." if cpf_consulta else "Nenhum demonstrativo pôde ser lido.")
+            st.stop()
+
+        # O imposto de cada mês é recalculado pela tabela do ano: uma linha capturada errada pelo
+        # parser aparece aqui, em vez de virar números errados nos gráficos
+        chaves = list(demonstrativos)
+        valores_auditados = [demonstrativos[chave][1].serie.valores for chave in chaves]
+        auditoria = auditar(valores_auditados, [demonstrativos[chave][1].ano for chave in chaves])
+        reprovados = np.flatnonzero(~auditoria["aprovado"])
+        if reprovados.size:
+            with st.expander(f"🔍 {reprovados.size} demonstrativo(s) com valores que não conferem"):
+                st.markdown("\n".join(
+                    f"- {demonstrativos[chaves[i]][0]} ({demonstrativos[chaves[i]][1].ano or 'ano desconhecido'}): {'; '.join(problemas(valores_auditados, auditoria, i))}"
+                    for i in reprovados
+                ))
+
+        chave_dados = next(iter(demonstrativos))
+        if len(demonstrativos) > 1:
+            rotulos = {
+                (f"{demonstrativo.ano} · {nome}" if demonstrativo.ano else nome): chave
+                for chave, (nome, demonstrativo) in sorted(demonstrativos.items(), key=lambda item: (item[1][1].ano or 0, item[1][0]))
             }
+            chave_dados = rotulos[st.selectbox("Demonstrativo:", list(rotulos), index=len(rotulos) - 1)]
+        demonstrativo = demonstrativos[chave_dados][1]
+        # Simulações pela tabela do IR do ano do demonstrativo; sem ano (ou sem tabela para ele), a padrão
+        ano = demonstrativo.ano if demonstrativo.ano in TABELAS_IR else None
 
         st.markdown(f"<h3 style='color:{COR_PRIMARIA}; margin-bottom:0.5em;'>🗓️ Selecione os meses</h3>", unsafe_allow_html=True)
         meses_selecionados = st.multiselect("Meses:", meses, default=meses)
 
         st.markdown("<div class='spacer-below-filter'></div>", unsafe_allow_html=True)
 
-        rendimentos = [dados_mensais[mes]["rendimento"] for mes in meses_selecionados]
-        deducoes = [dados_mensais[mes]["deducao"] for mes in meses_selecionados]
-        impostos = [dados_mensais[mes]["imposto"] for mes in meses_selecionados]
-        aliquotas = [dados_mensais[mes]["aliquota"] for mes in meses_selecionados]
+        # Totais, médias e séries saem dos componentes mensais pré-calculados do demonstrativo;
+        # cada seleção de meses é calculada uma vez
+        selecao = demonstrativo.serie.selecionar(meses_selecionados)
 
         st.markdown("<hr>", unsafe_allow_html=True)
 
         st.markdown(f"<h4 class='resumo-margin-top' style='color:{COR_PRIMARIA}'>📋 Resumo</h4>", unsafe_allow_html=True)
         col_a, col_b, col_c = st.columns(3)
-        valor_total_recebido = f"R$ {sum(rendimentos):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        valor_total_recebido = formatar_reais(selecao.total_rendimento)
         col_a.metric("Total Recebido", valor_total_recebido)
 
-        valor_total_impostos = f"R$ {sum(impostos):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        valor_total_impostos = formatar_reais(selecao.total_imposto)
         col_b.metric("Total de Impostos", valor_total_impostos)
 
-        valor_aliquota_media = f"{np.mean(aliquotas):.2f}".replace(".", ",") + "%"
+        valor_aliquota_media = f"{selecao.aliquota_media:.2f}".replace(".", ",") + "%"
         col_c.metric("Alíquota Média", valor_aliquota_media)
 
 
         col1, col2 = st.columns(2)
         with col1:
             st.markdown(f"<h4 style='color:{COR_PRIMARIA}'>📊 Comparativo de Valores</h4>", unsafe_allow_html=True)
-            fig_valores, ax = plt.subplots(figsize=(6, 3))
-            x = np.arange(len(meses_selecionados))
-            width = 0.25
-            ax.bar(x - width, rendimentos, width, label='Rendimento', color=COR_PRIMARIA)
-            ax.bar(x, deducoes, width, label='Deducao', color=COR_SECUNDARIA)
-            ax.bar(x + width, impostos, width, label='Imposto', color=COR_DESTAQUE)
-            ax.set_xticks(x)
-            ax.set_xticklabels(meses_selecionados)
-            ax.set_ylabel("R$")
-            ax.legend()
-            st.pyplot(fig_valores)
+            serie = (selecao.meses, selecao.rendimentos, selecao.deducoes, selecao.impostos)
+            exibir_grafico("valores", lambda: vega_valores(*serie), lambda: grafico_valores(chave_dados, *serie))
 
         with col2:
             st.markdown(f"<h4 style='color:{COR_PRIMARIA}'>📈 Evolução da Alíquota</h4>", unsafe_allow_html=True)
-            fig_aliquota, ax2 = plt.subplots(figsize=(6, 3))
-            ax2.plot(meses_selecionados, aliquotas, marker='o', color=COR_DESTAQUE)
-            ax2.set_ylim(0, max(aliquotas + [20]) + 2)
-            ax2.set_ylabel("%")
-            ax2.grid(True)
-            st.pyplot(fig_aliquota)
+            exibir_grafico(
+                "aliquota",
+                lambda: vega_aliquota(selecao.meses, selecao.aliquotas),
+                lambda: grafico_aliquota(chave_dados, selecao.meses, selecao.aliquotas),
+            )
 
         st.markdown(f"<h4 style='color:{COR_PRIMARIA}'>🚦 Alíquota Efetiva Média</h4>", unsafe_allow_html=True)
-        media_aliquota = round(np.mean(aliquotas), 2)
+        media_aliquota = round(selecao.aliquota_media, 2)
 
         fig_gauge = go.Figure(go.Indicator(
             number={'font': {'color': 'black'}},
@@ -168,7 +224,23 @@ if arquivo:
             }
         ))
         fig_gauge.update_layout(height=300, paper_bgcolor='white')
-        st.plotly_chart(fig_gauge)
+        exibir_plotly("medidor", fig_gauge)
+
+        # === Evolução plurianual ===
+        historico = historicos.get(demonstrativo.cpf)
+        if demonstrativo.ano is not None and historico is not None and len(historico) > 1:
+            st.markdown(f"<h4 style='color:{COR_PRIMARIA}'>📆 Evolução entre anos</h4>", unsafe_allow_html=True)
+            tendencias = historico.tendencias()
+            evolucao = (tendencias["ano"], tendencias["aliquota_efetiva"], tendencias["imposto_acumulado"])
+            exibir_grafico("historico", lambda: vega_historico(*evolucao), lambda: grafico_historico(historico.chaves, *evolucao))
+            st.dataframe({
+                "Ano": tendencias["ano"].astype(str),
+                "Rendimentos (R$)": tendencias["rendimento"],
+                "Impostos (R$)": tendencias["imposto"],
+                "Alíquota efetiva (%)": tendencias["aliquota_efetiva"],
+                "Variação (p.p.)": tendencias["variacao_aliquota"],
+                "Imposto acumulado (R$)": tendencias["imposto_acumulado"],
+            }, hide_index=True)
 
         # === Planejamento Tributário ===
         st.markdown("<hr>", unsafe_allow_html=True)
@@ -183,125 +255,33 @@ if arquivo:
                 outros_saude = st.number_input("Outros gastos com saúde (R$/mês)", min_value=0.0, format="%.2f")
 
             if st.button("Calcular Comparativo PF vs PJ"):
-                receita_mensal = sum(rendimentos) / len([v for v in rendimentos if v > 0])
-                despesas_consultorio = sum(deducoes) / len([v for v in deducoes if v > 0])
+                receita_mensal = selecao.receita_media
+                despesas_consultorio = selecao.despesas_media
                 despesas_pessoais = gasto_terapia + plano_saude + outros_saude
 
-                # Custo PF
-                contabilidade_pf = 289.00
-                inss_pf = 166.98  # fixo
-                base_completa = receita_mensal - despesas_consultorio - despesas_pessoais
-                base_completa = max(base_completa, 0)
-                ir_completa = 0
-                if base_completa <= 2259.20:
-                    ir_completa = 0
-                elif base_completa <= 2826.65:
-                    ir_completa = base_completa * 0.075 - 169.44
-                elif base_completa <= 3751.05:
-                    ir_completa = base_completa * 0.15 - 381.44
-                elif base_completa <= 4664.68:
-                    ir_completa = base_completa * 0.225 - 662.77
-                else:
-                    ir_completa = base_completa * 0.275 - 896.00
-                ir_completa = max(ir_completa, 0)
-                custo_total_pf_completa = contabilidade_pf + inss_pf + ir_completa
-
-                deducao_simplificada = min(receita_mensal * 0.2, 16754.34 / 12)
-                base_simplificada = receita_mensal - deducao_simplificada
-                base_simplificada = max(base_simplificada, 0)
-                ir_simplificada = 0
-                if base_simplificada <= 2259.20:
-                    ir_simplificada = 0
-                elif base_simplificada <= 2826.65:
-                    ir_simplificada = base_simplificada * 0.075 - 169.44
-                elif base_simplificada <= 3751.05:
-                    ir_simplificada = base_simplificada * 0.15 - 381.44
-                elif base_simplificada <= 4664.68:
-                    ir_simplificada = base_simplificada * 0.225 - 662.77
-                else:
-                    ir_simplificada = base_simplificada * 0.275 - 896.00
-                ir_simplificada = max(ir_simplificada, 0)
-                custo_total_pf_simplificada = contabilidade_pf + inss_pf + ir_simplificada
-
-                if custo_total_pf_completa < custo_total_pf_simplificada:
-                    custo_total_pf = custo_total_pf_completa
-                    tipo_pf = "Completa"
-                else:
-                    custo_total_pf = custo_total_pf_simplificada
-                    tipo_pf = "Simplificada"
-
-                if receita_mensal <= 15000:
-                    simples_pj = receita_mensal * 0.06
-                elif receita_mensal <= 20000:
-                    simples_pj = receita_mensal * 0.07
-                else:
-                    simples_pj = receita_mensal * 0.08
-
-                prolabore = max(1518.00, receita_mensal * 0.28)
-                inss_prolabore = prolabore * 0.11
-                base_ir_prolabore = prolabore - inss_prolabore
-
-                if base_ir_prolabore <= 2259.20:
-                    irrf_prolabore = 0
-                elif base_ir_prolabore <= 2826.65:
-                    irrf_prolabore = base_ir_prolabore * 0.075 - 169.44
-                elif base_ir_prolabore <= 3751.05:
-                    irrf_prolabore = base_ir_prolabore * 0.15 - 381.44
-                elif base_ir_prolabore <= 4664.68:
-                    irrf_prolabore = base_ir_prolabore * 0.225 - 662.77
-                else:
-                    irrf_prolabore = base_ir_prolabore * 0.275 - 896.00
-                irrf_prolabore = max(irrf_prolabore, 0)
-
-                # Restituição do IR do Pro Labore
-                # Determinar dedução da PJ com base em despesas pessoais vs. teto simplificado
-                if despesas_pessoais > 1396.20:
-                    tipo_deducao_pj = "Completa"
-                else:
-                    tipo_deducao_pj = "Simplificada"
-
-                if tipo_deducao_pj == "Completa":
-                    base_restituicao = base_ir_prolabore - despesas_pessoais
-                else:
-                    base_restituicao = prolabore * 0.8
-
-                if base_restituicao <= 2259.20:
-                    ir_restituir = 0
-                elif base_restituicao <= 2826.65:
-                    ir_restituir = base_restituicao * 0.075 - 169.44
-                elif base_restituicao <= 3751.05:
-                    ir_restituir = base_restituicao * 0.15 - 381.44
-                elif base_restituicao <= 4664.68:
-                    ir_restituir = base_restituicao * 0.225 - 662.77
-                else:
-                    ir_restituir = base_restituicao * 0.275 - 896.00
-                ir_restituir = max(ir_restituir, 0)
-
-                contabilidade_pj = 489.00
-                taxas_pj = 50.00
-                custo_total_pj = simples_pj + inss_prolabore + irrf_prolabore + contabilidade_pj + taxas_pj - (irrf_prolabore - ir_restituir)
+                with cronometrar("simulacao_pf_pj"):
+                    comparativo = comparar_pf_pj(receita_mensal, despesas_consultorio, despesas_pessoais, ano=ano)
+                custo_total_pf = comparativo["custo_total_pf"]
+                custo_total_pj = comparativo["custo_total_pj"]
 
                 st.markdown("## 💰 Resultado da Simulação")
                 col_pf, col_pj = st.columns(2)
                 with col_pf:
-                    st.metric("Custo Anual PF", f"R$ {custo_total_pf * 12:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
-                    st.caption(f"Custo mensal: R$ {custo_total_pf:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
+                    st.metric("Custo Anual PF", formatar_reais(custo_total_pf * 12))
+                    st.caption(f"Custo mensal: {formatar_reais(custo_total_pf)}")
                 with col_pj:
-                    st.metric("Custo Anual PJ", f"R$ {custo_total_pj * 12:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
-                    st.caption(f"Custo mensal: R$ {custo_total_pj:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
+                    st.metric("Custo Anual PJ", formatar_reais(custo_total_pj * 12))
+                    st.caption(f"Custo mensal: {formatar_reais(custo_total_pj)}")
 
-                economia = (custo_total_pf - custo_total_pj) * 12
+                economia = comparativo["economia_anual"]
                 if economia > 0:
                     st.success(f"💡 Migrar para PJ gera economia estimada de R$ {economia:,.2f} por ano")
                 else:
                     st.info(f"🤔 No cenário atual, PF ainda é mais vantajoso em cerca de R$ {abs(economia):,.2f} ao ano")
 
                 st.markdown("### 📊 Comparativo Visual")
-                fig_comp = plt.figure(figsize=(6,3))
-                plt.bar(["PF"], [custo_total_pf * 12], color=COR_PRIMARIA)
-                plt.bar(["PJ"], [custo_total_pj * 12], color=COR_SECUNDARIA)
-                plt.ylabel("Custo Anual (R$)")
-                st.pyplot(fig_comp)
+                custos_anuais = (custo_total_pf * 12, custo_total_pj * 12)
+                exibir_grafico("comparativo", lambda: vega_comparativo(*custos_anuais), lambda: grafico_comparativo(*custos_anuais))
 
                 # Debug: Exibir variáveis e fórmulas
                 # st.markdown("### 🧾 Variáveis e Fórmulas utilizadas")
@@ -309,23 +289,143 @@ if arquivo:
                 st.markdown(f"**Despesas consultório médias:** R$ {despesas_consultorio:.2f}")
                 st.markdown(f"**Despesas pessoais:** R$ {despesas_pessoais:.2f}")
 
-                deducao_completa = despesas_consultorio + despesas_pessoais + contabilidade_pf + inss_pf
-                st.markdown(f"**Dedução completa:** R$ {deducao_completa:.2f}")
-                st.markdown(f"**Dedução simplificada:** R$ {deducao_simplificada:.2f}")
-                st.markdown(f"**Base IR completa:** receita - dedução completa = R$ {base_completa:.2f}")
-                st.markdown(f"**IR completa:** R$ {ir_completa:.2f}")
-                st.markdown(f"**Base IR simplificada:** receita - dedução simplificada = R$ {base_simplificada:.2f}")
-                st.markdown(f"**IR simplificada:** R$ {ir_simplificada:.2f}")
+                st.markdown(f"**Dedução completa:** R$ {comparativo['deducao_completa']:.2f}")
+                st.markdown(f"**Dedução simplificada:** R$ {comparativo['deducao_simplificada']:.2f}")
+                st.markdown(f"**Base IR completa:** receita - dedução completa = R$ {comparativo['base_completa']:.2f}")
+                st.markdown(f"**IR completa:** R$ {comparativo['ir_completa']:.2f}")
+                st.markdown(f"**Base IR simplificada:** receita - dedução simplificada = R$ {comparativo['base_simplificada']:.2f}")
+                st.markdown(f"**IR simplificada:** R$ {comparativo['ir_simplificada']:.2f}")
                 st.markdown("---")
-                st.markdown(f"**Simples Nacional:** R$ {simples_pj:.2f}")
-                st.markdown(f"**Pró-labore:** R$ {prolabore:.2f}")
-                st.markdown(f"**INSS sobre pró-labore:** R$ {inss_prolabore:.2f}")
-                st.markdown(f"**Base IRRF pró-labore:** R$ {base_ir_prolabore:.2f}")
-                st.markdown(f"**IRRF sobre pró-labore:** R$ {irrf_prolabore:.2f}")
-                st.markdown(f"**Restituição IR pró-labore:** R$ {ir_restituir:.2f}")
+                st.markdown(f"**Simples Nacional:** R$ {comparativo['simples_pj']:.2f}")
+                st.markdown(f"**Pró-labore:** R$ {comparativo['prolabore']:.2f}")
+                st.markdown(f"**INSS sobre pró-labore:** R$ {comparativo['inss_prolabore']:.2f}")
+                st.markdown(f"**Base IRRF pró-labore:** R$ {comparativo['base_ir_prolabore']:.2f}")
+                st.markdown(f"**IRRF sobre pró-labore:** R$ {comparativo['irrf_prolabore']:.2f}")
+                st.markdown(f"**Restituição IR pró-labore:** R$ {comparativo['ir_restituir']:.2f}")
                 st.markdown(f"**Total PJ:** R$ {custo_total_pj:.2f}")
 
+                with cronometrar("otimizacao_prolabore"):
+                    otimo = otimizar_prolabore(receita_mensal, despesas_pessoais, ano=ano)
+                st.markdown(f"**Pró-labore ótimo:** R$ {otimo['prolabore']:.2f} (Anexo {otimo['anexo_simples']}, total PJ R$ {otimo['custo_total_pj']:.2f})")
+                if otimo["economia_anual_vs_padrao"] > 0.005:
+                    st.success(f"💡 Ajustar o pró-labore economiza mais R$ {otimo['economia_anual_vs_padrao']:,.2f} por ano em relação à regra dos 28%")
+
+            # === Sensibilidade PF x PJ ===
+            st.markdown("### 🗺️ Sensibilidade PF x PJ")
+            if st.toggle("Mostrar mapa de equilíbrio PF x PJ"):
+                faixa_receita = st.slider("Receita mensal (R$)", 0.0, 60000.0, (2000.0, 40000.0), step=500.0)
+                faixa_despesas = st.slider("Despesas pessoais (R$/mês)", 0.0, 10000.0, (0.0, 5000.0), step=100.0)
+                resolucao = st.select_slider("Resolução da grade", options=[100, 200, 300, 500], value=300)
+                despesas_consultorio_media = selecao.despesas_media
+
+                # A grade só é recalculada quando os parâmetros mudam; mover o slider para uma faixa já vista é instantâneo
+                parametros = (faixa_receita, faixa_despesas, resolucao, round(despesas_consultorio_media, 2), ano)
+                with cronometrar("sensibilidade", resolucao=resolucao):
+                    mapa = CACHE_SENSIBILIDADE.obter_ou_calcular(parametros, lambda: varrer_sensibilidade(
+                        np.linspace(*faixa_receita, resolucao),
+                        np.linspace(*faixa_despesas, resolucao),
+                        despesas_consultorio_media,
+                        ano=ano,
+                    ))
+
+                limite_cor = float(np.abs(mapa["economia_anual"]).max()) or 1.0
+                fig_sensibilidade = go.Figure(go.Heatmap(
+                    x=mapa["receitas"],
+                    y=mapa["despesas_pessoais"],
+                    z=np.round(mapa["economia_anual"]),
+                    colorscale="RdBu",
+                    zmid=0,
+                    zmin=-limite_cor,
+                    zmax=limite_cor,
+                    colorbar={'title': {'text': "Economia PJ (R$/ano)"}},
+                    hovertemplate="Receita: R$ %{x:,.0f}<br>Despesas pessoais: R$ %{y:,.0f}<br>Economia PJ: R$ %{z:,.0f}<extra></extra>",
+                ))
+                fig_sensibilidade.add_trace(go.Scattergl(
+                    x=mapa["equilibrio_receita"],
+                    y=mapa["equilibrio_despesas_pessoais"],
+                    mode="markers",
+                    marker={'color': 'black', 'size': 2},
+                    name="Equilíbrio PF = PJ",
+                    hoverinfo="skip",
+                ))
+                for salto in mapa["saltos_receita"]:
+                    if faixa_receita[0] < salto < faixa_receita[1]:
+                        fig_sensibilidade.add_vline(x=salto, line={'color': COR_DESTAQUE, 'dash': 'dot', 'width': 1})
+                fig_sensibilidade.update_layout(
+                    height=450,
+                    xaxis_title="Receita mensal (R$)",
+                    yaxis_title="Despesas pessoais (R$/mês)",
+                    showlegend=False,
+                    paper_bgcolor='white',
+                )
+                exibir_plotly("sensibilidade", fig_sensibilidade)
+                st.caption("Azul: PJ mais vantajosa. Vermelho: PF mais vantajosa. Linhas pontilhadas: piso do pró-labore e mudanças de faixa do Simples.")
+
+            # === Risco (Monte Carlo) ===
+            st.markdown("### 🎲 Faixas de risco (Monte Carlo)")
+            if st.toggle("Simular a variação da receita mês a mês"):
+                col_metodo, col_trajetorias, col_semente = st.columns(3)
+                with col_metodo:
+                    metodo = st.selectbox("Sorteio dos meses", ["bootstrap", "lognormal"], format_func={"bootstrap": "Meses do histórico", "lognormal": "Distribuição ajustada"}.get)
+                with col_trajetorias:
+                    trajetorias = st.select_slider("Trajetórias", options=[1000, 5000, 10000, 50000], value=10000)
+                with col_semente:
+                    semente = st.number_input("Semente", min_value=0, value=0, step=1)
+
+                if not any(rendimento > 0 for rendimento in selecao.rendimentos):
+                    st.info("Selecione meses com receita para simular.")
+                else:
+                    despesas_pessoais_risco = gasto_terapia + plano_saude + outros_saude
+                    # Mesma semente e mesmos parâmetros dão o mesmo resultado; o cache evita sortear de novo
+                    parametros = (chave_dados, selecao.meses, metodo, trajetorias, semente, round(despesas_pessoais_risco, 2), ano)
+                    with cronometrar("monte_carlo", trajetorias=trajetorias):
+                        risco = CACHE_MONTE_CARLO.obter_ou_calcular(parametros, lambda: simular_monte_carlo(
+                            selecao.rendimentos, selecao.deducoes, despesas_pessoais_risco, trajetorias, metodo, semente, ano=ano,
+                        ))
+
+                    p5, p25, p50, p75, p95 = risco["imposto_anual"]
+                    e5, _, e50, _, e95 = risco["economia_pj_anual"]
+                    col_ir, col_economia, col_probabilidade = st.columns(3)
+                    col_ir.metric("IR anual (mediana)", formatar_reais(p50), help=f"90% das trajetórias entre {formatar_reais(p5)} e {formatar_reais(p95)}")
+                    col_economia.metric("Economia PJ (mediana)", formatar_reais(e50), help=f"90% das trajetórias entre {formatar_reais(e5)} e {formatar_reais(e95)}")
+                    col_probabilidade.metric("Chance de a PJ compensar", f"{risco['probabilidade_pj']:.0%}")
+
+                    acumulado = risco["imposto_acumulado"]
+                    fig_risco = go.Figure([
+                        go.Scatter(x=meses, y=acumulado[4], line={'width': 0}, hoverinfo="skip", showlegend=False),
+                        go.Scatter(x=meses, y=acumulado[0], fill="tonexty", fillcolor="rgba(1,183,233,0.2)", line={'width': 0}, name="P5–P95"),
+                        go.Scatter(x=meses, y=acumulado[3], line={'width': 0}, hoverinfo="skip", showlegend=False),
+                        go.Scatter(x=meses, y=acumulado[1], fill="tonexty", fillcolor="rgba(1,183,233,0.45)", line={'width': 0}, name="P25–P75"),
+                        go.Scatter(x=meses, y=acumulado[2], line={'color': COR_PRIMARIA, 'width': 2}, name="Mediana"),
+                    ])
+                    fig_risco.update_layout(height=350, yaxis_title="IR acumulado (R$)", paper_bgcolor='white', hovermode="x unified")
+                    exibir_plotly("monte_carlo", fig_risco)
+                    st.caption(f"{trajetorias:,} trajetórias de 12 meses sorteadas a partir dos meses selecionados.".replace(",", "."))
+
 
 
     except Exception as e:
-        st.error(f"Erro ao processar o PDF: {e}")
\ No newline at end of file
+        st.error(f"Erro ao processar o PDF: {e}")
+
+# === Depuração (?debug=1) ===
+segundos_execucao = time.perf_counter() - inicio_execucao
+REGISTRO.observar("carneleao_etapa_segundos", segundos_execucao, etapa="rerun")
+if st.query_params.get("debug") == "1":
+    with st.expander("🛠️ Tempos desta execução", expanded=True):
+        st.caption(f"Rerun completo: {segundos_execucao * 1000:.1f} ms")
+        if etapas:
+            st.dataframe(etapas, hide_index=True)
+        if etapas_tarefa:
+            st.markdown("**Extração (fila de tarefas)**")
+            st.dataframe(etapas_tarefa, hide_index=True)
+        st.markdown("**Caches**")
+        st.dataframe(
+            [{**dict(rotulos), "consultas": valor} for rotulos, valor in sorted(REGISTRO.contadores("carneleao_cache_total").items())],
+            hide_index=True,
+        )
+        st.markdown("**Memória**")
+        caches = [*CACHES, st.session_state["memoria"]] if "memoria" in st.session_state else CACHES
+        st.dataframe([
+            {"cache": cache.nome, "itens": len(cache), "MB": round(cache.bytes / MB, 3), "limite (MB)": round(cache.max_bytes / MB, 1)}
+            for cache in caches
+        ], hide_index=True)
@@ -0,0 +1,167 @@
+"""Auditoria dos valores extraídos: confere os demonstrativos de um lote de uma só vez.
+
+O parser confia no que as regex capturam; se uma mudança de leiaute faz a linha
+errada casar, os números saem plausíveis mas errados. A auditoria recalcula o
+imposto de cada mês de cada arquivo a partir de rendimento - dedução, com a
+tabela progressiva do ano, numa única operação sobre o lote inteiro, e aponta:
+
+- meses cujo imposto não confere com nenhum cálculo aceito (tabela do ano ou a
+  do ano anterior, que vale nos meses antes da troca de tabela; com a dedução
+  informada ou com o desconto simplificado mensal);
+- valores fora da faixa: negativos, não numéricos, dedução maior que o
+  rendimento, imposto acima da alíquota máxima ou rendimento absurdo;
+- seções com quantidade de valores diferente de 12 (só na auditoria a partir do
+  PDF, que conta os valores antes da conversão).
+
+Uso:
+    python auditoria.py PASTA_DOS_PDFS --saida auditoria.csv --processos 8
+"""
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+
+from demonstrativo import MESES, MOTORES, contar_valores, extrair_secoes, extrair_texto, interpretar_texto
+from estaticos import formatar_br
+from tributos import TABELAS_IR
+
+TOLERANCIA = 0.05
+RENDIMENTO_MAXIMO = 5_000_000.0
+ALIQUOTA_MAXIMA = max(float(tabela.aliquotas.max()) for tabela in TABELAS_IR.values())
+_CAMPOS = ("rendimento", "dedução", "imposto")
+
+
+def auditar(valores, anos=None, colunas=None, tolerancia=TOLERANCIA):
+    """Confere um lote: `valores` é arquivos x 3 x 12 (rendimentos, deduções, impostos).
+
+    `anos` (um por arquivo, None quando desconhecido) escolhe a tabela do IR; arquivos
+    sem tabela conhecida só passam pelas conferências de faixa. `colunas`, opcional, é
+    arquivos x 3 com quantos valores cada seção tinha no texto. Devolve um dict de
+    arrays: o imposto esperado mais próximo do informado, as máscaras de cada problema
+    e `aprovado`, por arquivo.
+    """
+    valores = np.asarray(valores, dtype=np.float64).reshape(-1, 3, 12)
+    rendimentos, deducoes, impostos = valores[:, 0], valores[:, 1], valores[:, 2]
+    quantidade = len(valores)
+    anos = np.array([-1 if ano is None else ano for ano in anos] if anos is not None else [-1] * quantidade)
+
+    esperado = np.full((quantidade, 12), np.nan)
+    for ano in np.unique(anos):
+        if ano not in TABELAS_IR:
+            continue
+        tabelas = [TABELAS_IR[a] for a in (ano, ano - 1) if a in TABELAS_IR]
+        linhas = anos == ano
+        rendimento, deducao, imposto = rendimentos[linhas], deducoes[linhas], impostos[linhas]
+        # Todos os cálculos aceitos empilhados; fica o mais próximo do imposto informado
+        candidatos = np.stack([
+            np.round(tabela.calcular(np.maximum(rendimento - np.maximum(deducao, desconto), 0.0)), 2)
+            for tabela in tabelas
+            for desconto in (0.0, tabela.desconto_simplificado_mensal)
+        ])
+        mais_proximo = np.abs(candidatos - imposto).argmin(axis=0)
+        esperado[linhas] = np.take_along_axis(candidatos, mais_proximo[np.newaxis], axis=0)[0]
+
+    with np.errstate(invalid="ignore"):
+        divergente = np.abs(impostos - esperado) > tolerancia
+        fora_da_faixa = (
+            ~np.isfinite(valores).all(axis=1)
+            | (valores < 0).any(axis=1)
+            | (deducoes > rendimentos + tolerancia)
+            | (impostos > rendimentos * ALIQUOTA_MAXIMA + tolerancia)
+            | (rendimentos > RENDIMENTO_MAXIMO)
+        )
+    colunas_erradas = np.zeros(quantidade, dtype=bool) if colunas is None else (np.asarray(colunas) != 12).any(axis=1)
+    return {
+        "imposto_esperado": esperado,
+        "divergente": divergente,
+        "fora_da_faixa": fora_da_faixa,
+        "colunas_erradas": colunas_erradas,
+        "sem_tabela": ~np.isin(anos, list(TABELAS_IR)),
+        "aprovado": ~(divergente.any(axis=1) | fora_da_faixa.any(axis=1) | colunas_erradas),
+    }
+
+
+def problemas(valores, resultado, indice, colunas=None):
+    """Descrição legível dos problemas de um arquivo do lote auditado."""
+    valores = np.asarray(valores, dtype=np.float64).reshape(-1, 3, 12)[indice]
+    descricoes = []
+    if resultado["colunas_erradas"][indice]:
+        contagens = ", ".join(f"{campo} com {quantidade}" for campo, quantidade in zip(_CAMPOS, colunas[indice]) if quantidade != 12)
+        descricoes.append(f"seções com quantidade de valores diferente de 12 ({contagens})")
+    for mes in np.flatnonzero(resultado["fora_da_faixa"][indice]):
+        rendimento, deducao, imposto = valores[:, mes]
+        descricoes.append(f"{MESES[mes]}: valores fora da faixa (rendimento {formatar_br(rendimento)}, dedução {formatar_br(deducao)}, imposto {formatar_br(imposto)})")
+    for mes in np.flatnonzero(resultado["divergente"][indice]):
+        descricoes.append(f"{MESES[mes]}: imposto {formatar_br(valores[2, mes])}, esperado {formatar_br(resultado['imposto_esperado'][indice, mes])}")
+    return descricoes
+
+
+def ler_para_auditoria(caminho, motor=None):
+    """Extrai um PDF contando os valores das seções; roda nos processos do pool."""
+    colunas = None
+    try:
+        texto = extrair_texto(caminho, motor)
+        colunas = contar_valores(extrair_secoes(texto))
+        demonstrativo = interpretar_texto(texto)
+        return str(caminho), demonstrativo.matriz().tolist(), demonstrativo.ano, colunas, None
+    except Exception as e:
+        return str(caminho), None, None, colunas, f"{type(e).__name__}: {e}"
+
+
+def auditar_pasta(pasta, processos=None, motor=None, tolerancia=TOLERANCIA):
+    """Extrai a pasta em paralelo e audita tudo de uma vez; devolve as linhas do relatório por arquivo."""
+    from lote import listar_pdfs, processar_em_paralelo
+
+    lidos, linhas = [], []
+    for caminho, valores, ano, colunas, erro in processar_em_paralelo(listar_pdfs(pasta), processos, motor, tarefa=ler_para_auditoria):
+        if erro:
+            detalhe = f" (valores por seção: {', '.join(map(str, colunas))})" if colunas else ""
+            linhas.append({"arquivo": caminho, "ano": None, "aprovado": False, "meses_divergentes": None, "problemas": erro + detalhe})
+        else:
+            lidos.append((caminho, valores, ano, colunas))
+
+    if lidos:
+        caminhos, valores, anos, colunas = zip(*lidos)
+        resultado = auditar(valores, anos, colunas, tolerancia)
+        for i, caminho in enumerate(caminhos):
+            descricoes = problemas(valores, resultado, i, colunas)
+            if resultado["sem_tabela"][i]:
+                descricoes.append(f"sem tabela do IR para o ano {anos[i]}; imposto não conferido")
+            linhas.append({
+                "arquivo": caminho,
+                "ano": anos[i],
+                "aprovado": bool(resultado["aprovado"][i]),
+                "meses_divergentes": int(resultado["divergente"][i].sum()),
+                "problemas": "; ".join(descricoes),
+            })
+    return sorted(linhas, key=lambda linha: linha["arquivo"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audita os valores extraídos dos demonstrativos de uma pasta.")
+    parser.add_argument("pasta", help="pasta com os PDFs (busca recursiva)")
+    parser.add_argument("--saida", default=None, help="relatório por arquivo em CSV (padrão: só o resumo)")
+    parser.add_argument("--processos", type=int, default=None, help="processos de extração (padrão: número de núcleos)")
+    parser.add_argument("--motor", choices=list(MOTORES), default=None, help="motor de extração de texto (padrão: pdfplumber)")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="diferença aceita no imposto de cada mês, em reais")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    linhas = auditar_pasta(args.pasta, args.processos, args.motor, args.tolerancia)
+    if args.saida:
+        with open(args.saida, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.DictWriter(f, fieldnames=["arquivo", "ano", "aprovado", "meses_divergentes", "problemas"])
+            escritor.writeheader()
+            escritor.writerows(linhas)
+
+    reprovados = [linha for linha in linhas if not linha["aprovado"]]
+    for linha in reprovados:
+        print(f"REPROVADO {linha['arquivo']}: {linha['problemas']}", file=sys.stderr)
+    print(f"{len(linhas)} arquivos auditados em {time.perf_counter() - inicio:.1f}s: {len(linhas) - len(reprovados)} aprovados, {len(reprovados)} reprovados.")
+    return 1 if reprovados else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
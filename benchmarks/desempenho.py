@@ -0,0 +1,213 @@
+"""Benchmarks de extração, motor do IR, simulação PF x PJ e gráficos.
+
+Gera demonstrativos sintéticos (benchmarks/gerador.py) numa pasta temporária,
+confere que a extração devolve os valores gerados e mede cada etapa. O
+resultado vai para JSON; com --comparar, cada medida é comparada à mesma
+medida de uma execução anterior e as que pioraram além da tolerância são
+apontadas (o código de saída passa a ser 1).
+
+Uso:
+    python benchmarks/desempenho.py --saida base.json
+    python benchmarks/desempenho.py --saida atual.json --comparar base.json --tolerancia 0.15
+    python benchmarks/desempenho.py --apenas extracao,simulacao --pdfs 50
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+from gerador import gerar_pasta  # noqa: E402
+
+
+def _cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def _medida(tempos, itens=1, unidade="ms"):
+    """Mediana e mínimo por item; as comparações entre execuções usam a mediana."""
+    escala = {"ms": 1e3, "us": 1e6, "ns": 1e9}[unidade]
+    return {
+        "mediana": round(statistics.median(tempos) / itens * escala, 3),
+        "minimo": round(min(tempos) / itens * escala, 3),
+        "unidade": f"{unidade}/item" if itens > 1 else unidade,
+        "itens": itens,
+        "repeticoes": len(tempos),
+    }
+
+
+def bench_extracao(esperados, repeticoes):
+    """Texto do PDF por motor (por arquivo) e o demonstrativo completo, conferindo os valores gerados."""
+    from demonstrativo import MOTORES, extrair_texto, ler_demonstrativo
+
+    caminhos = list(esperados)
+    resultado = {}
+    for motor in MOTORES:
+        for caminho in caminhos:
+            demonstrativo = ler_demonstrativo(caminho, motor)
+            esperado = esperados[caminho]
+            if (demonstrativo.cpf, demonstrativo.ano, demonstrativo.totais()) != (esperado["cpf"], esperado["ano"], esperado["totais"]):
+                raise AssertionError(f"{motor}: extração de {caminho} não confere com os valores gerados")
+        tempos = _cronometrar(lambda: [extrair_texto(caminho, motor) for caminho in caminhos], repeticoes)
+        resultado[f"texto_{motor}"] = _medida(tempos, len(caminhos))
+    return resultado
+
+
+def bench_regex(esperados, repeticoes):
+    """Interpretação do texto já extraído: regex, conversão dos números e montagem do demonstrativo."""
+    from demonstrativo import extrair_secoes, extrair_texto, interpretar_texto
+
+    textos = [extrair_texto(caminho, "pdfium") for caminho in esperados] * 20
+    return {
+        "secoes": _medida(_cronometrar(lambda: [extrair_secoes(texto) for texto in textos], repeticoes), len(textos), "us"),
+        "interpretar_texto": _medida(_cronometrar(lambda: [interpretar_texto(texto) for texto in textos], repeticoes), len(textos), "us"),
+    }
+
+
+def bench_ir(repeticoes, tamanho=1_000_000):
+    from tributos import calcular_ir, calcular_simples
+
+    bases = np.random.default_rng(0).uniform(0, 60000, tamanho)
+    return {
+        "calcular_ir_vetor": _medida(_cronometrar(lambda: calcular_ir(bases), repeticoes), tamanho, "ns"),
+        "calcular_ir_escalar": _medida(_cronometrar(lambda: [calcular_ir(b) for b in bases[:10000].tolist()], repeticoes), 10000, "us"),
+        "calcular_simples_vetor": _medida(_cronometrar(lambda: calcular_simples(bases, "V"), repeticoes), tamanho, "ns"),
+    }
+
+
+def bench_simulacao(repeticoes, cenarios=100_000):
+    from simulacao import comparar_pf_pj, otimizar_prolabore, simular_monte_carlo, varrer_sensibilidade
+
+    aleatorio = np.random.default_rng(1)
+    receitas = aleatorio.uniform(2000, 40000, cenarios)
+    consultorio = aleatorio.uniform(0, 5000, cenarios)
+    pessoais = aleatorio.uniform(0, 4000, cenarios)
+    return {
+        "comparar_pf_pj_vetor": _medida(_cronometrar(lambda: comparar_pf_pj(receitas, consultorio, pessoais), repeticoes), cenarios, "ns"),
+        "comparar_pf_pj_escalar": _medida(_cronometrar(lambda: [comparar_pf_pj(r, c, p) for r, c, p in zip(
+            receitas[:2000].tolist(), consultorio[:2000].tolist(), pessoais[:2000].tolist())], repeticoes), 2000, "us"),
+        "otimizar_prolabore_vetor": _medida(_cronometrar(lambda: otimizar_prolabore(receitas, pessoais), repeticoes), cenarios, "ns"),
+        "sensibilidade_300x300": _medida(_cronometrar(lambda: varrer_sensibilidade(
+            np.linspace(2000, 40000, 300), np.linspace(0, 5000, 300), 1500.0), repeticoes)),
+        "monte_carlo_10k": _medida(_cronometrar(lambda: simular_monte_carlo(receitas[:12], consultorio[:12], 1500.0), repeticoes)),
+    }
+
+
+def bench_graficos(repeticoes):
+    from demonstrativo import MESES
+    from especificacoes import vega_aliquota, vega_valores
+    from graficos import png_aliquota, png_comparativo, png_medidor, png_valores
+
+    aleatorio = np.random.default_rng(2)
+    rendimentos, deducoes, impostos = aleatorio.uniform(0, 25000, (3, 12)).tolist()
+    aliquotas = aleatorio.uniform(0, 25, 12).tolist()
+    png_valores(MESES, rendimentos, deducoes, impostos)  # aquece fontes e caches internos do matplotlib
+    return {
+        "png_valores": _medida(_cronometrar(lambda: png_valores(MESES, rendimentos, deducoes, impostos), repeticoes)),
+        "png_aliquota": _medida(_cronometrar(lambda: png_aliquota(MESES, aliquotas), repeticoes)),
+        "png_medidor": _medida(_cronometrar(lambda: png_medidor(12.5), repeticoes)),
+        "png_comparativo": _medida(_cronometrar(lambda: png_comparativo(35000.0, 23000.0), repeticoes)),
+        "vega_valores": _medida(_cronometrar(lambda: vega_valores(MESES, rendimentos, deducoes, impostos), repeticoes), unidade="us"),
+        "vega_aliquota": _medida(_cronometrar(lambda: vega_aliquota(MESES, aliquotas), repeticoes), unidade="us"),
+    }
+
+
+BENCHMARKS = {
+    "extracao": lambda contexto: bench_extracao(contexto["esperados"], contexto["repeticoes"]),
+    "regex": lambda contexto: bench_regex(contexto["esperados"], contexto["repeticoes"]),
+    "ir": lambda contexto: bench_ir(contexto["repeticoes"]),
+    "simulacao": lambda contexto: bench_simulacao(contexto["repeticoes"]),
+    "graficos": lambda contexto: bench_graficos(contexto["repeticoes"]),
+}
+
+
+def _ambiente():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=RAIZ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "maquina": platform.machine(),
+        "nucleos": os.cpu_count(),
+    }
+
+
+def comparar(atual, base, tolerancia):
+    """Lista (medida, base, atual, variação) das medidas presentes nas duas execuções que pioraram além da tolerância."""
+    regressoes = []
+    for grupo, medidas in atual["resultados"].items():
+        for nome, medida in medidas.items():
+            anterior = base.get("resultados", {}).get(grupo, {}).get(nome)
+            if anterior is None or anterior["unidade"] != medida["unidade"] or not anterior["mediana"]:
+                continue
+            variacao = medida["mediana"] / anterior["mediana"] - 1
+            if variacao > tolerancia:
+                regressoes.append((f"{grupo}.{nome}", anterior["mediana"], medida["mediana"], variacao))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de extração, IR, simulação e gráficos.")
+    parser.add_argument("--apenas", default=",".join(BENCHMARKS), help=f"grupos separados por vírgula ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--pdfs", type=int, default=30, help="demonstrativos sintéticos usados na extração")
+    parser.add_argument("--paginas", type=int, default=1, help="páginas por demonstrativo sintético")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", default=None, help="grava o resultado em JSON")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior, usado como base")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="piora relativa da mediana aceita antes de apontar regressão")
+    args = parser.parse_args(argv)
+
+    grupos = [grupo.strip() for grupo in args.apenas.split(",") if grupo.strip()]
+    desconhecidos = set(grupos) - BENCHMARKS.keys()
+    if desconhecidos:
+        parser.error(f"grupos desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    with tempfile.TemporaryDirectory(prefix="carneleao-bench-") as pasta:
+        contexto = {"repeticoes": args.repeticoes, "esperados": {}}
+        if {"extracao", "regex"} & set(grupos):
+            contexto["esperados"] = gerar_pasta(pasta, args.pdfs, paginas=args.paginas)
+        resultados = {}
+        for grupo in grupos:
+            resultados[grupo] = BENCHMARKS[grupo](contexto)
+            for nome, medida in resultados[grupo].items():
+                print(f"{grupo + '.' + nome:>38}: mediana {medida['mediana']:10.3f} {medida['unidade']:<8} (mín. {medida['minimo']:.3f})")
+
+    execucao = {"ambiente": _ambiente(), "parametros": vars(args), "resultados": resultados}
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(execucao, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar(execucao, base, args.tolerancia)
+        for nome, anterior, atual, variacao in regressoes:
+            print(f"REGRESSÃO {nome}: {anterior} -> {atual} ({variacao:+.0%})")
+        if not regressoes:
+            print(f"Sem regressões acima de {args.tolerancia:.0%} em relação a {args.comparar}.")
+        return 1 if regressoes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Gerador de demonstrativos sintéticos do Carnê-Leão, para benchmarks e testes manuais.
+
+Os PDFs seguem o leiaute do demonstrativo real (cabeçalho com nome, ano e CPF;
+blocos de rendimentos, deduções e cálculo do imposto, um valor por mês), com
+valores aleatórios mas coerentes: o imposto de cada mês sai da tabela
+progressiva do ano. Com --paginas 2 os meses são divididos entre duas páginas
+(Jan a Jun, Jul a Dez), como nos demonstrativos longos.
+
+Uso:
+    python benchmarks/gerador.py PASTA --quantidade 200 --ano 2024 --paginas 1
+"""
+import argparse
+import os
+import random
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np  # noqa: E402
+from reportlab.lib.pagesizes import A4, landscape  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from demonstrativo import MESES  # noqa: E402
+from estaticos import formatar_br  # noqa: E402
+from tributos import ANO_PADRAO, TABELAS_IR, calcular_ir  # noqa: E402
+
+NOMES = ["ANA", "BRUNO", "CARLA", "DIEGO", "ELISA", "FABIO", "GABRIELA", "HELENA", "IGOR", "JULIANA", "LUCAS", "MARINA"]
+SOBRENOMES = ["SILVA", "SOUZA", "OLIVEIRA", "SANTOS", "PEREIRA", "COSTA", "RODRIGUES", "ALMEIDA", "NASCIMENTO", "LIMA"]
+
+
+def gerar_cpf(aleatorio):
+    """CPF com dígitos verificadores válidos."""
+    digitos = [aleatorio.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(d * peso for d, peso in zip(digitos, range(tamanho + 1, 1, -1)))
+        digitos.append((soma * 10 % 11) % 10)
+    texto = "".join(map(str, digitos))
+    return f"{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}"
+
+
+def gerar_valores(aleatorio, ano=ANO_PADRAO):
+    """Linhas mensais do demonstrativo; devolve um dict rótulo -> 12 valores."""
+    # Receita com sazonalidade (férias em jan/jul, pico no 2º semestre) e alguns meses sem atendimento
+    base = aleatorio.uniform(3000, 25000)
+    sazonal = np.array([0.6, 0.9, 1.0, 1.0, 1.05, 1.0, 0.7, 1.0, 1.1, 1.1, 1.15, 0.9])
+    trabalho = np.round(base * sazonal * [aleatorio.uniform(0.8, 1.2) for _ in MESES], 2)
+    trabalho[[aleatorio.random() < 0.05 for _ in MESES]] = 0.0
+    alugueis = np.round(np.full(12, aleatorio.choice([0.0, 0.0, 0.0, aleatorio.uniform(800, 3500)])), 2)
+    total = trabalho + alugueis
+
+    previdencia = np.where(total > 0, round(aleatorio.uniform(150, 900), 2), 0.0)
+    dependentes = np.full(12, 189.59 * aleatorio.choice([0, 0, 1, 2]))
+    livro_caixa = np.round(np.minimum(trabalho * [aleatorio.uniform(0.05, 0.25) for _ in MESES], trabalho), 2)
+    deducao = np.round(np.minimum(previdencia + dependentes + livro_caixa, total), 2)
+
+    base_calculo = np.round(total - deducao, 2)
+    imposto = np.round(calcular_ir(base_calculo, ano if ano in TABELAS_IR else None), 2)
+    return {
+        "Trabalho Não Assalariado": trabalho,
+        "Aluguéis": alugueis,
+        "Total": total,
+        "Previdência Oficial": previdencia,
+        "Dependentes": dependentes,
+        "Livro Caixa": livro_caixa,
+        "Dedução Considerada": deducao,
+        "Base de Cálculo": base_calculo,
+        "Imposto Devido I": imposto,
+        "Imposto Pago": imposto,
+    }
+
+
+_BLOCOS = (
+    ("Rendimentos", ("Trabalho Não Assalariado", "Aluguéis", "Total")),
+    ("Deduções", ("Previdência Oficial", "Dependentes", "Livro Caixa", "Dedução Considerada")),
+    ("Cálculo do Imposto", ("Base de Cálculo", "Imposto Devido I", "Imposto Pago")),
+)
+
+
+def gerar_demonstrativo(destino, semente, ano=ANO_PADRAO, paginas=1):
+    """Grava um demonstrativo em `destino` e devolve os valores esperados na extração."""
+    aleatorio = random.Random(semente)
+    nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}"
+    cpf = gerar_cpf(aleatorio)
+    valores = gerar_valores(aleatorio, ano)
+
+    documento = canvas.Canvas(str(destino), pagesize=landscape(A4))
+    meses_por_pagina = -(-len(MESES) // paginas)
+    for inicio in range(0, len(MESES), meses_por_pagina):
+        fatia = slice(inicio, inicio + meses_por_pagina)
+        y = 560
+        if inicio == 0:
+            documento.setFont("Helvetica-Bold", 9)
+            documento.drawString(20, y, f"NOME: {nome} DEMONSTRATIVO DE APURAÇÃO - CARNÊ-LEÃO {ano}")
+            documento.drawString(20, y - 14, f"CPF: {cpf}")
+            y -= 40
+        documento.setFont("Helvetica", 6.5)
+        for titulo, linhas in _BLOCOS:
+            documento.drawString(20, y, f"{titulo} {' '.join(MESES[fatia])}")
+            y -= 12
+            for rotulo in linhas:
+                documento.drawString(20, y, f"{rotulo} {' '.join(formatar_br(v) for v in valores[rotulo][fatia])}")
+                y -= 12
+            y -= 6
+        documento.showPage()
+    documento.save()
+
+    return {
+        "nome": nome,
+        "cpf": cpf,
+        "ano": ano,
+        "totais": {
+            "rendimento": round(float(valores["Total"].sum()), 2),
+            "deducao": round(float(valores["Dedução Considerada"].sum()), 2),
+            "imposto": round(float(valores["Imposto Devido I"].sum()), 2),
+        },
+    }
+
+
+def gerar_pasta(pasta, quantidade, ano=ANO_PADRAO, paginas=1, semente_inicial=0):
+    """Gera `quantidade` PDFs em `pasta`; devolve {caminho: valores esperados}."""
+    os.makedirs(pasta, exist_ok=True)
+    esperados = {}
+    for i in range(quantidade):
+        caminho = os.path.join(pasta, f"demonstrativo_{semente_inicial + i:05d}.pdf")
+        esperados[caminho] = gerar_demonstrativo(caminho, semente_inicial + i, ano, paginas)
+    return esperados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera demonstrativos sintéticos do Carnê-Leão.")
+    parser.add_argument("pasta")
+    parser.add_argument("--quantidade", type=int, default=100)
+    parser.add_argument("--ano", type=int, default=ANO_PADRAO)
+    parser.add_argument("--paginas", type=int, default=1, choices=(1, 2, 3, 4, 6, 12))
+    parser.add_argument("--semente", type=int, default=0, help="semente do primeiro PDF (os seguintes usam as próximas)")
+    args = parser.parse_args(argv)
+
+    gerar_pasta(args.pasta, args.quantidade, args.ano, args.paginas, args.semente)
+    print(f"{args.quantidade} demonstrativos gerados em {args.pasta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Tempo até a primeira renderização do dashboard em um processo frio.
+
+Cada repetição roda em um processo Python novo, como uma réplica recém-criada:
+o Streamlit já está importado (o servidor sobe antes da primeira requisição) e
+mede-se quanto a primeira execução do app.py leva para terminar a página
+inicial, sem PDF. Com --pdf, mede também a primeira execução com um
+demonstrativo enviado (quando as dependências pesadas entram) e um rerun.
+
+Uso:
+    python benchmarks/inicializacao.py --repeticoes 5 --pdf demonstrativo.pdf --saida inicializacao.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MEDICAO = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app, pdf = sys.argv[1], sys.argv[2]
+tempos = {}
+inicio = time.perf_counter()
+at = AppTest.from_file(app, default_timeout=120).run()
+tempos["primeira_renderizacao"] = time.perf_counter() - inicio
+if at.exception:
+    raise SystemExit(str(at.exception))
+
+if pdf:
+    with open(pdf, "rb") as f:
+        at.file_uploader[0].upload("demonstrativo.pdf", f.read(), "application/pdf")
+    inicio = time.perf_counter()
+    at.run()
+    tempos["primeiro_upload"] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    at.run()
+    tempos["rerun"] = time.perf_counter() - inicio
+print(json.dumps(tempos))
+"""
+
+
+def medir(app, pdf=None):
+    saida = subprocess.run(
+        [sys.executable, "-c", _MEDICAO, app, pdf or ""],
+        capture_output=True, text=True, check=True, cwd=RAIZ,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização a frio do dashboard.")
+    parser.add_argument("--app", default=os.path.join(RAIZ, "app.py"))
+    parser.add_argument("--pdf", default=None, help="demonstrativo para medir também o primeiro upload")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", default=None, help="grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    medicoes = [medir(args.app, args.pdf) for _ in range(args.repeticoes)]
+    resultado = {
+        etapa: {
+            "mediana_ms": round(statistics.median(m[etapa] for m in medicoes) * 1000, 1),
+            "min_ms": round(min(m[etapa] for m in medicoes) * 1000, 1),
+        }
+        for etapa in medicoes[0]
+    }
+    for etapa, valores in resultado.items():
+        print(f"{etapa:>22}: mediana {valores['mediana_ms']:8.1f} ms  (mín. {valores['min_ms']:.1f} ms)")
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from metricas import REGISTRO
+
+
+def hash_conteudo(conteudo):
+    """Hash SHA-256 dos bytes enviados, usado como chave dos caches."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def tamanho_em_bytes(valor):
+    """Estimativa da memória de um valor guardado em cache.
+
+    Objetos que sabem o próprio tamanho (método `tamanho_em_bytes`) respondem por si;
+    arrays contam os dados (`nbytes`); dicts, listas e tuplas somam os itens.
+    """
+    medir = getattr(valor, "tamanho_em_bytes", None)
+    if callable(medir):
+        return medir()
+    nbytes = getattr(valor, "nbytes", None)
+    if isinstance(nbytes, int):
+        return sys.getsizeof(valor) if getattr(valor, "base", None) is None else sys.getsizeof(valor) + nbytes
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(k) + tamanho_em_bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Cache LRU limitado por quantidade de itens e, opcionalmente, por memória, com expiração por TTL (segundos).
+
+    Fica em um módulo importado para sobreviver aos reruns do Streamlit, que
+    reexecutam o script inteiro mas não recarregam os módulos importados. Com
+    `max_bytes`, cada valor é medido por tamanho_em_bytes ao ser guardado e os
+    menos usados saem até o total caber no orçamento (o recém-guardado fica
+    sempre, mesmo sozinho acima do limite).
+    """
+
+    def __init__(self, max_itens=128, ttl=3600, nome=None, max_bytes=None):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] < time.monotonic():
+                del self._itens[chave]
+                self.bytes -= item[2]
+                item = None
+            if item is not None:
+                self._itens.move_to_end(chave)
+        if self.nome:
+            REGISTRO.contar("carneleao_cache_total", cache=self.nome, resultado="falta" if item is None else "acerto")
+        return padrao if item is None else item[1]
+
+    def guardar(self, chave, valor):
+        """Guarda (ou regrava, atualizando o tamanho medido) o valor como o mais recente."""
+        tamanho = tamanho_em_bytes(valor) if self.max_bytes else 0
+        descartados = 0
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= anterior[2]
+            self._itens[chave] = (time.monotonic() + self.ttl, valor, tamanho)
+            self.bytes += tamanho
+            while len(self._itens) > self.max_itens or (self.max_bytes and self.bytes > self.max_bytes and len(self._itens) > 1):
+                self.bytes -= self._itens.popitem(last=False)[1][2]
+                descartados += 1
+        if descartados and self.nome:
+            REGISTRO.contar("carneleao_cache_descartes_total", descartados, cache=self.nome)
+
+    def obter_ou_calcular(self, chave, calcular):
+        ausente = object()
+        valor = self.obter(chave, ausente)
+        if valor is ausente:
+            valor = calcular()
+            self.guardar(chave, valor)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+
+MB = 2 ** 20
+
+# Orçamento de memória de cada sessão do dashboard (históricos por CPF e o que mais a sessão guardar)
+MEMORIA_SESSAO = int(float(os.environ.get("CARNELEAO_MEMORIA_SESSAO_MB", 8)) * MB)
+
+
+def cache_da_sessao():
+    """Cache dos artefatos de uma sessão, guardado em st.session_state, dentro de MEMORIA_SESSAO.
+
+    O que sai por falta de espaço é refeito a partir do armazém quando volta a ser pedido.
+    """
+    return CacheLRU(max_itens=256, ttl=12 * 60 * 60, nome="sessao", max_bytes=MEMORIA_SESSAO)
+
+
+# Demonstrativos já processados, por hash do PDF enviado
+# (cada um conta ~17 KB: o bloco de valores e a série do filtro de meses no tamanho máximo)
+CACHE_DEMONSTRATIVOS = CacheLRU(max_itens=1024, ttl=60 * 60, nome="demonstrativos", max_bytes=16 * MB)
+
+# Índice membro -> hash dos ZIPs enviados, por hash do ZIP
+CACHE_PACOTES = CacheLRU(max_itens=16, ttl=60 * 60, nome="pacotes", max_bytes=4 * MB)
+
+# Grades da análise de sensibilidade PF x PJ, por parâmetros da varredura
+CACHE_SENSIBILIDADE = CacheLRU(max_itens=32, ttl=60 * 60, nome="sensibilidade", max_bytes=64 * MB)
+
+# PNGs dos gráficos, por (gráfico, conjunto de dados, meses, tema)
+CACHE_GRAFICOS = CacheLRU(max_itens=256, ttl=60 * 60, nome="graficos", max_bytes=64 * MB)
+
+# Projeções mês a mês do modo simular, pelos vetores de receita e despesa
+CACHE_PROJECOES = CacheLRU(max_itens=128, ttl=60 * 60, nome="projecoes", max_bytes=8 * MB)
+
+# Percentis do Monte Carlo de risco, por (demonstrativo, meses, método, trajetórias, semente, despesas, ano)
+CACHE_MONTE_CARLO = CacheLRU(max_itens=32, ttl=60 * 60, nome="monte_carlo", max_bytes=8 * MB)
+
+CACHES = (CACHE_DEMONSTRATIVOS, CACHE_PACOTES, CACHE_SENSIBILIDADE, CACHE_GRAFICOS, CACHE_PROJECOES, CACHE_MONTE_CARLO)
+REGISTRO.medidor("carneleao_cache_bytes", lambda: sum(cache.bytes for cache in CACHES))
@@ -0,0 +1,391 @@
+import ctypes
+import io
+import mmap
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+from metricas import cronometrar, medir_pico_memoria
+
+MESES = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+_INDICE_MES = {mes: i for i, mes in enumerate(MESES)}
+CAMPOS = ("rendimento", "deducao", "imposto")
+
+
+@dataclass(slots=True, eq=False)
+class Demonstrativo:
+    """Demonstrativo extraído, com os 12 meses num único bloco float64 de 3 x 12 (na ordem de CAMPOS).
+
+    É o objeto que fica nos caches e na sessão, então guarda só o bloco (somente
+    leitura; ~600 bytes por demonstrativo, contra ~4 KB do dict de 12 dicts de
+    floats); a alíquota mensal e o `dados_mensais` são derivados sob demanda. Com a
+    série do filtro de meses cheia, o pior caso fica em ~17 KB (ver tamanho_em_bytes).
+    """
+    nome: str | None
+    cpf: str | None
+    valores: np.ndarray
+    ano: int | None = None
+    _serie: object = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.valores = np.array(self.valores, dtype=np.float64).reshape(len(CAMPOS), len(MESES))
+        self.valores.flags.writeable = False
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Inverso de como_dict (JSON da API, progresso do processamento em lote)."""
+        meses = dados["dados_mensais"]
+        valores = [[meses[mes][campo] for mes in MESES] for campo in CAMPOS]
+        return cls(nome=dados["nome"], cpf=dados["cpf"], valores=valores, ano=dados.get("ano"))
+
+    def como_dict(self):
+        return {"nome": self.nome, "cpf": self.cpf, "dados_mensais": self.dados_mensais, "ano": self.ano}
+
+    def __getstate__(self):
+        # A série do filtro de meses não viaja (ex.: do pool de processos da API); é refeita no uso
+        return self.nome, self.cpf, self.valores, self.ano
+
+    def __setstate__(self, estado):
+        self.nome, self.cpf, self.valores, self.ano = estado
+        self.valores.flags.writeable = False
+        self._serie = None
+
+    def __eq__(self, outro):
+        if not isinstance(outro, Demonstrativo):
+            return NotImplemented
+        return (self.nome, self.cpf, self.ano) == (outro.nome, outro.cpf, outro.ano) and np.array_equal(self.valores, outro.valores)
+
+    @property
+    def aliquotas(self):
+        rendimentos, _, impostos = self.valores
+        return np.round(np.divide(impostos, rendimentos, out=np.zeros(len(MESES)), where=rendimentos > 0) * 100, 2)
+
+    @property
+    def dados_mensais(self):
+        """Mês -> rendimento, dedução, imposto e alíquota; montado a cada acesso, para exportação."""
+        rendimentos, deducoes, impostos = self.valores.tolist()
+        return {
+            mes: {"rendimento": rendimento, "deducao": deducao, "imposto": imposto, "aliquota": aliquota}
+            for mes, rendimento, deducao, imposto, aliquota in zip(MESES, rendimentos, deducoes, impostos, self.aliquotas.tolist())
+        }
+
+    def totais(self):
+        return {campo: round(sum(linha), 2) for campo, linha in zip(CAMPOS, self.valores.tolist())}
+
+    def como_linha(self):
+        """Representação plana (uma linha por cliente) para exportação CSV."""
+        linha = {"nome": self.nome, "cpf": self.cpf, "ano": self.ano}
+        for chave, valor in self.totais().items():
+            linha[f"{chave}_total"] = valor
+        for mes, dados in self.dados_mensais.items():
+            for chave, valor in dados.items():
+                linha[f"{chave}_{mes}"] = valor
+        return linha
+
+    def matriz(self):
+        """Valores mensais em colunas: matriz 3 x 12 (rendimentos, deduções, impostos), somente leitura."""
+        return self.valores
+
+    @property
+    def serie(self):
+        """Componentes mensais pré-calculados, usados pelo filtro de meses do dashboard; montados no primeiro uso."""
+        if self._serie is None:
+            self._serie = SerieMensal(self)
+        return self._serie
+
+    def tamanho_em_bytes(self):
+        """Memória ocupada, contando a série do filtro de meses no seu tamanho máximo.
+
+        A série é montada e vai guardando seleções depois que o demonstrativo já está em
+        cache, onde o tamanho é medido uma única vez; contar o pior caso mantém o
+        orçamento do cache valendo.
+        """
+        textos = sum(sys.getsizeof(texto) for texto in (self.nome, self.cpf) if texto)
+        return sys.getsizeof(self) + self.valores.nbytes + textos + SerieMensal.tamanho_maximo()
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Selecao:
+    """Totais e médias de um subconjunto dos meses; as séries mensais saem da máscara sob demanda.
+
+    Guarda só a máscara e os totais: as listas (na ordem do calendário) são fatiadas do
+    bloco 3 x 12 do demonstrativo, compartilhado com a série, a cada acesso.
+    """
+    mascara: np.ndarray
+    valores: np.ndarray = field(repr=False)
+    aliquotas_mensais: np.ndarray = field(repr=False)
+    total_rendimento: float
+    total_deducao: float
+    total_imposto: float
+    aliquota_media: float
+    receita_media: float
+    despesas_media: float
+
+    @property
+    def meses(self):
+        return tuple(MESES[i] for i in np.flatnonzero(self.mascara))
+
+    @property
+    def rendimentos(self):
+        return self.valores[0, self.mascara].tolist()
+
+    @property
+    def deducoes(self):
+        return self.valores[1, self.mascara].tolist()
+
+    @property
+    def impostos(self):
+        return self.valores[2, self.mascara].tolist()
+
+    @property
+    def aliquotas(self):
+        return self.aliquotas_mensais[self.mascara].tolist()
+
+
+# Estimativas medidas com tracemalloc: a série montada (arrays e o próprio objeto) e cada seleção
+# guardada (a máscara, os totais e a chave no dicionário)
+_BYTES_SERIE = 4096
+_BYTES_SELECAO = 768
+
+
+class SerieMensal:
+    """Os 12 meses de um demonstrativo em arrays, com somas acumuladas para qualquer seleção de meses.
+
+    A seleção vira uma máscara de 12 posições: meses contíguos (o caso comum, como o ano
+    inteiro ou um semestre) saem da diferença de duas somas acumuladas, os demais da soma
+    mascarada. Cada seleção é calculada uma vez; voltar a uma já vista não recalcula nada.
+    Guarda no máximo MAX_SELECOES seleções, descartando as mais antigas.
+    """
+    MAX_SELECOES = 16
+
+    def __init__(self, demonstrativo):
+        self.valores = demonstrativo.matriz()
+        self.aliquotas = demonstrativo.aliquotas
+        # Coluna 0 zerada: a soma dos meses i..j-1 é acumulados[:, j] - acumulados[:, i]
+        self.acumulados = np.zeros((3, 13))
+        np.cumsum(self.valores, axis=1, out=self.acumulados[:, 1:])
+        self.com_valor = np.zeros((3, 13), dtype=np.int64)
+        np.cumsum(self.valores > 0, axis=1, out=self.com_valor[:, 1:])
+        self.aliquotas.flags.writeable = False
+        self._selecoes = {}
+        # O dashboard pode consultar a mesma série de sessões diferentes ao mesmo tempo
+        self._trava = threading.Lock()
+
+    def selecionar(self, meses):
+        mascara = np.zeros(len(MESES), dtype=bool)
+        mascara[[_INDICE_MES[mes] for mes in meses]] = True
+        mascara.flags.writeable = False
+        chave = mascara.tobytes()
+        with self._trava:
+            selecao = self._selecoes.get(chave)
+            if selecao is None:
+                if len(self._selecoes) >= self.MAX_SELECOES:
+                    del self._selecoes[next(iter(self._selecoes))]
+                selecao = self._selecoes[chave] = self._calcular(mascara)
+        return selecao
+
+    @classmethod
+    def tamanho_maximo(cls):
+        return _BYTES_SERIE + cls.MAX_SELECOES * _BYTES_SELECAO
+
+    def _calcular(self, mascara):
+        indices = np.flatnonzero(mascara)
+        if indices.size and indices[-1] - indices[0] + 1 == indices.size:
+            inicio, fim = indices[0], indices[-1] + 1
+            totais = self.acumulados[:, fim] - self.acumulados[:, inicio]
+            com_valor = self.com_valor[:, fim] - self.com_valor[:, inicio]
+        else:
+            totais = self.valores[:, mascara].sum(axis=1)
+            com_valor = np.count_nonzero(self.valores[:, mascara] > 0, axis=1)
+        medias = np.divide(totais, com_valor, out=np.zeros(3), where=com_valor > 0)
+        return Selecao(
+            mascara=mascara,
+            valores=self.valores,
+            aliquotas_mensais=self.aliquotas,
+            total_rendimento=float(totais[0]),
+            total_deducao=float(totais[1]),
+            total_imposto=float(totais[2]),
+            aliquota_media=float(self.aliquotas[mascara].mean()) if indices.size else 0.0,
+            receita_media=float(medias[0]),
+            despesas_media=float(medias[1]),
+        )
+
+
+# As bibliotecas de PDF são importadas só pelo motor que for usado
+def _texto_pdfplumber(fonte):
+    import pdfplumber
+
+    if isinstance(fonte, (bytes, bytearray)):
+        fonte = io.BytesIO(fonte)
+    with pdfplumber.open(fonte) as pdf:
+        return "\n".join(pagina.extract_text() or "" for pagina in pdf.pages)
+
+
+@lru_cache(maxsize=1)
+def _laparams_demonstrativo():
+    from pdfminer.layout import LAParams
+
+    # Demonstrativo é uma tabela de linhas longas: char_margin alto mantém rótulo e
+    # valores de cada linha no mesmo bloco, line_margin baixo evita juntar linhas.
+    return LAParams(char_margin=50.0, line_margin=0.1)
+
+
+class _ArquivoMapeado(io.RawIOBase):
+    """Interface de arquivo (io.IOBase, exigida pelo pdfminer) sobre um mmap, lendo do mapa sob demanda."""
+
+    def __init__(self, mapa):
+        super().__init__()
+        self._mapa = mapa
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, destino):
+        dados = self._mapa.read(len(destino))
+        destino[:len(dados)] = dados
+        return len(dados)
+
+    def seek(self, posicao, origem=io.SEEK_SET):
+        self._mapa.seek(posicao, origem)
+        return self._mapa.tell()
+
+    def tell(self):
+        return self._mapa.tell()
+
+
+def _texto_pdfminer(fonte):
+    from pdfminer.high_level import extract_text
+
+    if isinstance(fonte, (bytes, bytearray)):
+        fonte = io.BytesIO(fonte)
+    elif isinstance(fonte, mmap.mmap):
+        fonte = _ArquivoMapeado(fonte)
+    return extract_text(fonte, laparams=_laparams_demonstrativo())
+
+
+def _texto_pdfium(fonte):
+    import pypdfium2
+
+    # Lê direto os trechos de texto da página via PDFium (C), sem montar o modelo de layout
+    if isinstance(fonte, os.PathLike):
+        fonte = str(fonte)
+    elif isinstance(fonte, mmap.mmap):
+        # PDFium lê as páginas mapeadas no lugar, sem copiar o arquivo para a memória do processo
+        fonte = (ctypes.c_char * len(fonte)).from_buffer(fonte)
+    documento = pypdfium2.PdfDocument(fonte)
+    textos = []
+    try:
+        for pagina in documento:
+            texto_pagina = pagina.get_textpage()
+            textos.append(texto_pagina.get_text_bounded())
+            texto_pagina.close()
+            pagina.close()
+    finally:
+        documento.close()
+    return "\n".join(textos)
+
+
+MOTORES = {
+    "pdfplumber": _texto_pdfplumber,
+    "pdfminer": _texto_pdfminer,
+    "pdfium": _texto_pdfium,
+}
+MOTOR_PADRAO = os.environ.get("CARNELEAO_MOTOR_PDF", "pdfplumber")
+
+
+def extrair_texto(fonte, motor=None):
+    """Texto de todas as páginas do PDF, em ordem; `fonte` pode ser bytes, caminho, arquivo aberto ou mmap.
+
+    `motor` escolhe a extração: "pdfplumber" (referência), "pdfminer" (LAParams
+    ajustados) ou "pdfium" (caminho rápido, sem análise de layout).
+    """
+    motor = motor or MOTOR_PADRAO
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de extração desconhecido: {motor!r} (opções: {', '.join(MOTORES)})")
+    return MOTORES[motor](fonte)
+
+
+# Uma única expressão percorre o texto uma vez só e reconhece as seções usadas:
+# o cabeçalho (nome, ano, CPF) e as três linhas de totais que formam o bloco
+# 3 x 12 do Demonstrativo. As linhas de detalhe (Trabalho Não Assalariado,
+# Aluguéis, Previdência Oficial, Dependentes, Livro Caixa, Base de Cálculo e
+# Imposto Pago) são puladas de propósito: nada as consome, e entrar no bloco
+# mudaria o formato gravado no armazém e lido pela auditoria e pelo histórico.
+# Os rótulos que fecham cada linha ficam em lookahead, sem consumir texto, para
+# continuarem disponíveis como início da seção seguinte.
+_SECOES = re.compile(r"""
+      NOME:\s+(?P<nome>.*?)\s+DEMONSTRATIVO
+    | (?:APURAÇÃO|Ano[-\ ]?[Cc]alendário|ANO[-\ ]?CALENDÁRIO)\D{0,30}?(?P<ano>20\d{2})\b
+    | CPF:\s+(?P<cpf>[\d\.]+-\d+)
+    | Total\s+(?P<rendimentos_total>[\d\.,\s]+)\s(?=\s*Deduções)
+    | Dedução\ Considerada\s+(?P<deducao_considerada>[\d\.,\s]+)\s(?=\s*Cálculo)
+    | Imposto\ Devido\ I\s+(?P<imposto_devido_I>[\d\.,\s]+)\s(?=\s*Imposto\ Pago)
+""", re.VERBOSE)
+_SECOES_NUMERICAS = ("rendimentos_total", "deducao_considerada", "imposto_devido_I")
+
+# "1.234,56" -> "1234.56" em uma única passada sobre as três linhas de valores
+_FORMATO_BR = str.maketrans({".": None, ",": "."})
+
+
+def extrair_secoes(texto):
+    """Texto bruto de cada seção reconhecida no demonstrativo (cabeçalho e as três linhas de totais).
+
+    Nome, CPF e ano vêm da primeira ocorrência. Uma linha de valores quebrada
+    entre páginas (ex.: Jan a Jun em uma, Jul a Dez na outra) aparece mais de
+    uma vez; os trechos são concatenados em ordem até somar os 12 meses.
+    """
+    secoes = {}
+    pendentes = set(_SECOES.groupindex)
+    for match in _SECOES.finditer(texto):
+        grupo = match.lastgroup
+        if grupo not in pendentes:
+            continue
+        trecho = match.group(grupo)
+        if grupo in _SECOES_NUMERICAS:
+            trecho = f"{secoes[grupo]} {trecho}" if grupo in secoes else trecho
+            if len(trecho.split()) < 12:
+                secoes[grupo] = trecho
+                continue
+        secoes[grupo] = trecho
+        pendentes.discard(grupo)
+        if not pendentes:
+            break
+    return secoes
+
+
+def contar_valores(secoes):
+    """Quantos valores cada seção numérica tem, antes de extrair_valores ficar só com os 12 primeiros."""
+    return [len(secoes.get(nome, "").split()) for nome in _SECOES_NUMERICAS]
+
+
+def extrair_valores(secoes):
+    """Matriz 3 x 12 (rendimentos, deduções, impostos) convertida de uma vez para float64."""
+    tokens = []
+    for nome in _SECOES_NUMERICAS:
+        valores = secoes.get(nome, "").split()
+        if len(valores) < 12:
+            raise ValueError(f"Seção {nome} com {len(valores)} valores; esperados 12")
+        tokens.extend(valores[:12])
+    return np.array(" ".join(tokens).translate(_FORMATO_BR).split(), dtype=np.float64).reshape(3, 12)
+
+
+def interpretar_texto(texto):
+    secoes = extrair_secoes(texto)
+    ano = int(secoes["ano"]) if "ano" in secoes else None
+    return Demonstrativo(nome=secoes.get("nome"), cpf=secoes.get("cpf"), valores=extrair_valores(secoes), ano=ano)
+
+
+def ler_demonstrativo(fonte, motor=None):
+    """Extrai nome, CPF, ano e os 12 meses de rendimento/dedução/imposto de um demonstrativo do Carnê-Leão."""
+    with medir_pico_memoria(), cronometrar("extracao_texto", motor=motor or MOTOR_PADRAO):
+        texto = extrair_texto(fonte, motor)
+    with cronometrar("interpretacao"):
+        return interpretar_texto(texto)
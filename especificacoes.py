@@ -0,0 +1,111 @@
+"""Gráficos do dashboard como especificações Vega-Lite, renderizadas no navegador.
+
+Alternativa aos PNGs de graficos.py: em vez de rasterizar no servidor, o
+dashboard envia um dict declarativo com os próprios valores mensais (alguns KB,
+contra dezenas a centenas de KB de PNG) e o navegador desenha. Não depende do
+matplotlib, que só é importado quando o formato configurado é "png".
+
+O formato vem de CARNELEAO_GRAFICOS ("vega", o padrão, ou "png"); o relatório
+em PDF continua usando os PNGs.
+"""
+import json
+import os
+
+from estaticos import TEMA_PADRAO, TEMAS
+
+FORMATO_GRAFICOS = os.environ.get("CARNELEAO_GRAFICOS", "vega")
+ALTURA = 260
+
+
+def _centavos(valores):
+    return [round(float(valor), 2) for valor in valores]
+
+
+def tamanho(especificacao):
+    """Bytes da especificação serializada, o que de fato vai para o navegador."""
+    return len(json.dumps(especificacao, separators=(",", ":"), ensure_ascii=False).encode())
+
+
+def vega_valores(meses, rendimentos, deducoes, impostos, tema=TEMA_PADRAO):
+    cores = TEMAS[tema]
+    series = ["Rendimento", "Dedução", "Imposto"]
+    return {
+        "data": {"values": [
+            {"mes": mes, "Rendimento": r, "Dedução": d, "Imposto": i}
+            for mes, r, d, i in zip(meses, _centavos(rendimentos), _centavos(deducoes), _centavos(impostos))
+        ]},
+        "transform": [{"fold": series, "as": ["serie", "valor"]}],
+        "mark": "bar",
+        "encoding": {
+            "x": {"field": "mes", "type": "ordinal", "sort": list(meses), "title": None},
+            "xOffset": {"field": "serie", "sort": series},
+            "y": {"field": "valor", "type": "quantitative", "title": "R$"},
+            "color": {
+                "field": "serie",
+                "scale": {"domain": series, "range": [cores["primaria"], cores["secundaria"], cores["destaque"]]},
+                "legend": {"orient": "top", "title": None},
+            },
+            "tooltip": [{"field": "mes", "title": "Mês"}, {"field": "serie", "title": "Série"}, {"field": "valor", "title": "R$", "format": ",.2f"}],
+        },
+        "height": ALTURA,
+    }
+
+
+def vega_aliquota(meses, aliquotas, tema=TEMA_PADRAO):
+    return {
+        "data": {"values": [{"mes": mes, "aliquota": a} for mes, a in zip(meses, _centavos(aliquotas))]},
+        "mark": {"type": "line", "point": True, "color": TEMAS[tema]["destaque"]},
+        "encoding": {
+            "x": {"field": "mes", "type": "ordinal", "sort": list(meses), "title": None},
+            "y": {"field": "aliquota", "type": "quantitative", "title": "%", "scale": {"domain": [0, max(list(aliquotas) + [20]) + 2]}},
+            "tooltip": [{"field": "mes", "title": "Mês"}, {"field": "aliquota", "title": "Alíquota (%)", "format": ".2f"}],
+        },
+        "height": ALTURA,
+    }
+
+
+def vega_comparativo(custo_anual_pf, custo_anual_pj, tema=TEMA_PADRAO):
+    cores = TEMAS[tema]
+    return {
+        "data": {"values": [{"regime": "PF", "custo": round(custo_anual_pf, 2)}, {"regime": "PJ", "custo": round(custo_anual_pj, 2)}]},
+        "mark": "bar",
+        "encoding": {
+            "x": {"field": "regime", "type": "nominal", "title": None, "axis": {"labelAngle": 0}},
+            "y": {"field": "custo", "type": "quantitative", "title": "Custo Anual (R$)"},
+            "color": {"field": "regime", "scale": {"domain": ["PF", "PJ"], "range": [cores["primaria"], cores["secundaria"]]}, "legend": None},
+            "tooltip": [{"field": "regime", "title": "Regime"}, {"field": "custo", "title": "R$", "format": ",.2f"}],
+        },
+        "height": ALTURA,
+    }
+
+
+def vega_historico(anos, aliquotas, imposto_acumulado, tema=TEMA_PADRAO):
+    """Alíquota efetiva por ano (linha) sobre o imposto acumulado (barras, eixo à direita)."""
+    cores = TEMAS[tema]
+    eixo_x = {"field": "ano", "type": "ordinal", "title": None, "axis": {"labelAngle": 0}}
+    return {
+        "data": {"values": [
+            {"ano": str(ano), "aliquota": a, "acumulado": c}
+            for ano, a, c in zip(anos, _centavos(aliquotas), _centavos(imposto_acumulado))
+        ]},
+        "layer": [
+            {
+                "mark": {"type": "bar", "color": cores["secundaria"], "opacity": 0.35},
+                "encoding": {"x": eixo_x, "y": {"field": "acumulado", "type": "quantitative", "title": "R$ acumulado", "axis": {"orient": "right"}}},
+            },
+            {
+                "mark": {"type": "line", "point": True, "color": cores["destaque"]},
+                "encoding": {
+                    "x": eixo_x,
+                    "y": {"field": "aliquota", "type": "quantitative", "title": "%", "scale": {"domain": [0, max(list(aliquotas) + [20]) + 2]}},
+                },
+            },
+        ],
+        "resolve": {"scale": {"y": "independent"}},
+        "encoding": {"tooltip": [
+            {"field": "ano", "title": "Ano"},
+            {"field": "aliquota", "title": "Alíquota efetiva (%)", "format": ".2f"},
+            {"field": "acumulado", "title": "Imposto acumulado (R$)", "format": ",.2f"},
+        ]},
+        "height": ALTURA,
+    }
@@ -0,0 +1,58 @@
+import os
+from functools import lru_cache
+
+# === IDENTIDADE VISUAL ===
+COR_PRIMARIA = "#0b485a"
+COR_SECUNDARIA = "#01b7e9"
+COR_DESTAQUE = "#e59500"
+
+# Cores dos gráficos (PNG e Vega-Lite) por tema
+TEMAS = {
+    "claro": {"primaria": COR_PRIMARIA, "secundaria": COR_SECUNDARIA, "destaque": COR_DESTAQUE, "fundo": "white", "texto": "black"},
+    "escuro": {"primaria": COR_SECUNDARIA, "secundaria": "#7fd8f2", "destaque": COR_DESTAQUE, "fundo": "#0e1117", "texto": "white"},
+}
+TEMA_PADRAO = "claro"
+
+# "1,234.56" (formato do Python) -> "1.234,56"
+_SEPARADORES_BR = str.maketrans(",.", ".,")
+
+
+def formatar_br(valor):
+    """Número com duas casas no formato brasileiro: 1234.5 -> "1.234,50"."""
+    return f"{valor:,.2f}".translate(_SEPARADORES_BR)
+
+
+def formatar_reais(valor):
+    return f"R$ {formatar_br(valor)}"
+
+
+CAMINHO_LOGO = os.path.join(os.path.dirname(__file__), "logo.png")
+
+ESTILO_CSS = """
+    <style>
+        @media print {
+            body {
+                -webkit-print-color-adjust: exact;
+            }
+            .element-container {
+                page-break-inside: avoid;
+            }
+        }
+        .spacer-below-filter {
+            margin-bottom: 60px;
+        }
+        .resumo-margin-top {
+            margin-top: 30px;
+        }
+    </style>
+"""
+
+
+@lru_cache(maxsize=1)
+def carregar_logo():
+    """Bytes do logo, lidos do disco uma única vez por processo; None se o arquivo não existir."""
+    try:
+        with open(CAMINHO_LOGO, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
@@ -0,0 +1,148 @@
+"""Gráficos do dashboard renderizados como PNG, sem o estado global do pyplot.
+
+Cada gráfico é montado em uma `Figure` própria (fora do registro de figuras do
+pyplot), salvo em bytes e descartado logo em seguida. Os bytes ficam em cache
+por (conjunto de dados, meses selecionados, tema), então um rerun que não muda o
+gráfico não renderiza nada.
+"""
+import io
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.patches import Wedge
+
+from cache import CACHE_GRAFICOS
+from estaticos import TEMA_PADRAO, TEMAS
+from metricas import cronometrado
+
+DPI = 200
+
+
+def _nova_figura(tema, figsize=(6, 3)):
+    cores = TEMAS[tema]
+    figura = Figure(figsize=figsize, facecolor=cores["fundo"])
+    eixo = figura.subplots()
+    eixo.set_facecolor(cores["fundo"])
+    eixo.tick_params(colors=cores["texto"])
+    eixo.yaxis.label.set_color(cores["texto"])
+    for borda in eixo.spines.values():
+        borda.set_color(cores["texto"])
+    return figura, eixo, cores
+
+
+def _png(figura):
+    """Salva a figura em PNG e libera seus artistas na hora, sem esperar o coletor de lixo."""
+    try:
+        buffer = io.BytesIO()
+        figura.savefig(buffer, format="png", dpi=DPI, bbox_inches="tight", facecolor=figura.get_facecolor())
+        return buffer.getvalue()
+    finally:
+        figura.clear()
+
+
+@cronometrado("grafico_valores")
+def png_valores(meses, rendimentos, deducoes, impostos, tema=TEMA_PADRAO):
+    figura, eixo, cores = _nova_figura(tema)
+    x = np.arange(len(meses))
+    largura = 0.25
+    eixo.bar(x - largura, rendimentos, largura, label='Rendimento', color=cores["primaria"])
+    eixo.bar(x, deducoes, largura, label='Deducao', color=cores["secundaria"])
+    eixo.bar(x + largura, impostos, largura, label='Imposto', color=cores["destaque"])
+    eixo.set_xticks(x)
+    eixo.set_xticklabels(meses)
+    eixo.set_ylabel("R$")
+    eixo.legend()
+    return _png(figura)
+
+
+@cronometrado("grafico_aliquota")
+def png_aliquota(meses, aliquotas, tema=TEMA_PADRAO):
+    figura, eixo, cores = _nova_figura(tema)
+    eixo.plot(meses, aliquotas, marker='o', color=cores["destaque"])
+    eixo.set_ylim(0, max(list(aliquotas) + [20]) + 2)
+    eixo.set_ylabel("%")
+    eixo.grid(True)
+    return _png(figura)
+
+
+@cronometrado("grafico_comparativo")
+def png_comparativo(custo_anual_pf, custo_anual_pj, tema=TEMA_PADRAO):
+    figura, eixo, cores = _nova_figura(tema)
+    eixo.bar(["PF"], [custo_anual_pf], color=cores["primaria"])
+    eixo.bar(["PJ"], [custo_anual_pj], color=cores["secundaria"])
+    eixo.set_ylabel("Custo Anual (R$)")
+    return _png(figura)
+
+
+@cronometrado("grafico_historico")
+def png_historico(anos, aliquotas, imposto_acumulado, tema=TEMA_PADRAO):
+    """Alíquota efetiva por ano (linha) sobre o imposto acumulado (barras, eixo à direita)."""
+    figura, eixo, cores = _nova_figura(tema)
+    rotulos = [str(ano) for ano in anos]
+    eixo_acumulado = eixo.twinx()
+    eixo_acumulado.bar(rotulos, imposto_acumulado, color=cores["secundaria"], alpha=0.35, label="Imposto acumulado")
+    eixo_acumulado.set_ylabel("R$ acumulado", color=cores["texto"])
+    eixo_acumulado.tick_params(colors=cores["texto"])
+    for borda in eixo_acumulado.spines.values():
+        borda.set_color(cores["texto"])
+    eixo.plot(rotulos, aliquotas, marker='o', color=cores["destaque"], label="Alíquota efetiva")
+    eixo.set_ylim(0, max(list(aliquotas) + [20]) + 2)
+    eixo.set_ylabel("%")
+    eixo.set_zorder(eixo_acumulado.get_zorder() + 1)
+    eixo.patch.set_visible(False)
+    eixo.grid(True)
+    return _png(figura)
+
+
+@cronometrado("grafico_medidor")
+def png_medidor(valor, tema=TEMA_PADRAO, maximo=20.0):
+    """Medidor semicircular da alíquota média, equivalente ao indicador Plotly do dashboard."""
+    figura = Figure(figsize=(4, 2.4), facecolor=TEMAS[tema]["fundo"])
+    cores = TEMAS[tema]
+    eixo = figura.subplots()
+    eixo.set_aspect("equal")
+    eixo.axis("off")
+
+    def angulo(v):
+        return 180.0 * (1 - min(max(v, 0.0), maximo) / maximo)
+
+    for inicio, fim, cor in ((0, 10, "green"), (10, 15, "yellow"), (15, maximo, "red")):
+        eixo.add_patch(Wedge((0, 0), 1.0, angulo(fim), angulo(inicio), width=0.3, color=cor))
+    for marca in range(0, int(maximo) + 1, 5):
+        rad = np.radians(angulo(marca))
+        eixo.text(1.12 * np.cos(rad), 1.12 * np.sin(rad), str(marca), ha="center", va="center", fontsize=7, color=cores["texto"])
+
+    rad = np.radians(angulo(valor))
+    eixo.plot([0, 0.85 * np.cos(rad)], [0, 0.85 * np.sin(rad)], color=cores["secundaria"], linewidth=3)
+    eixo.add_patch(Wedge((0, 0), 0.06, 0, 360, color=cores["texto"]))
+    eixo.text(0, -0.25, f"{valor:.2f}%".replace(".", ","), ha="center", va="center", fontsize=16, fontweight="bold", color=cores["texto"])
+    eixo.set_xlim(-1.25, 1.25)
+    eixo.set_ylim(-0.45, 1.25)
+    return _png(figura)
+
+
+def grafico_valores(chave_dados, meses, rendimentos, deducoes, impostos, tema=TEMA_PADRAO):
+    """PNG do comparativo mensal; `chave_dados` identifica o demonstrativo (ex.: hash do PDF)."""
+    chave = ("valores", chave_dados, tuple(meses), tema)
+    return CACHE_GRAFICOS.obter_ou_calcular(chave, lambda: png_valores(meses, rendimentos, deducoes, impostos, tema))
+
+
+def grafico_aliquota(chave_dados, meses, aliquotas, tema=TEMA_PADRAO):
+    chave = ("aliquota", chave_dados, tuple(meses), tema)
+    return CACHE_GRAFICOS.obter_ou_calcular(chave, lambda: png_aliquota(meses, aliquotas, tema))
+
+
+def grafico_medidor(chave_dados, meses, valor, tema=TEMA_PADRAO):
+    chave = ("medidor", chave_dados, tuple(meses), tema)
+    return CACHE_GRAFICOS.obter_ou_calcular(chave, lambda: png_medidor(valor, tema))
+
+
+def grafico_historico(chaves_dados, anos, aliquotas, imposto_acumulado, tema=TEMA_PADRAO):
+    """PNG da evolução plurianual; `chaves_dados` identifica os demonstrativos de cada ano."""
+    chave = ("historico", tuple(chaves_dados), tema)
+    return CACHE_GRAFICOS.obter_ou_calcular(chave, lambda: png_historico(anos, aliquotas, imposto_acumulado, tema))
+
+
+def grafico_comparativo(custo_anual_pf, custo_anual_pj, tema=TEMA_PADRAO):
+    chave = ("comparativo", round(custo_anual_pf, 2), round(custo_anual_pj, 2), tema)
+    return CACHE_GRAFICOS.obter_ou_calcular(chave, lambda: png_comparativo(custo_anual_pf, custo_anual_pj, tema))
@@ -0,0 +1,86 @@
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class Historico:
+    """Demonstrativos de vários anos de um mesmo cliente, guardados em colunas.
+
+    Cada ano vira uma linha: `valores` (anos x 3 x 12, na ordem de demonstrativo.CAMPOS),
+    `totais` (anos x 3) e `imposto_acumulado`. Os totais do ano são somados uma
+    vez, ao adicionar; incluir ou trocar um ano só mexe nessa linha e desloca o
+    acumulado dos anos seguintes, sem reler nem somar de novo o histórico.
+    """
+    cpf: str | None = None
+    nome: str | None = None
+    anos: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int16))
+    chaves: list = field(default_factory=list)
+    valores: np.ndarray = field(default_factory=lambda: np.empty((0, 3, 12)))
+    totais: np.ndarray = field(default_factory=lambda: np.empty((0, 3)))
+    imposto_acumulado: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    def __len__(self):
+        return len(self.anos)
+
+    def adicionar(self, demonstrativo, chave=None):
+        """Inclui (ou substitui, se o ano já existe) um demonstrativo; devolve False se a chave já está no histórico."""
+        if demonstrativo.ano is None:
+            raise ValueError("Ano do demonstrativo não identificado")
+        if self.cpf and demonstrativo.cpf and demonstrativo.cpf != self.cpf:
+            raise ValueError(f"Demonstrativo de outro CPF ({demonstrativo.cpf}); histórico de {self.cpf}")
+        if chave is not None and chave in self.chaves:
+            return False
+        self.cpf = self.cpf or demonstrativo.cpf
+        self.nome = self.nome or demonstrativo.nome
+
+        valores = demonstrativo.matriz()
+        totais = valores.sum(axis=1)
+        posicao = int(np.searchsorted(self.anos, demonstrativo.ano))
+        if posicao < len(self.anos) and self.anos[posicao] == demonstrativo.ano:
+            # Demonstrativo retificado: troca a linha e corrige o acumulado pela diferença
+            self.imposto_acumulado[posicao:] += totais[2] - self.totais[posicao, 2]
+            self.valores[posicao], self.totais[posicao] = valores, totais
+            self.chaves[posicao] = chave
+            return True
+
+        anterior = self.imposto_acumulado[posicao - 1] if posicao else 0.0
+        self.imposto_acumulado[posicao:] += totais[2]
+        self.anos = np.insert(self.anos, posicao, demonstrativo.ano)
+        self.chaves.insert(posicao, chave)
+        self.valores = np.insert(self.valores, posicao, valores, axis=0)
+        self.totais = np.insert(self.totais, posicao, totais, axis=0)
+        self.imposto_acumulado = np.insert(self.imposto_acumulado, posicao, anterior + totais[2])
+        return True
+
+    def tamanho_em_bytes(self):
+        arrays = (self.anos, self.valores, self.totais, self.imposto_acumulado)
+        textos = [texto for texto in (self.cpf, self.nome, *self.chaves) if texto]
+        return sys.getsizeof(self) + sum(array.nbytes for array in arrays) + sys.getsizeof(self.chaves) + sum(map(sys.getsizeof, textos))
+
+    def remover(self, ano):
+        posicao = int(np.searchsorted(self.anos, ano))
+        if posicao == len(self.anos) or self.anos[posicao] != ano:
+            raise KeyError(ano)
+        self.imposto_acumulado[posicao + 1:] -= self.totais[posicao, 2]
+        self.anos = np.delete(self.anos, posicao)
+        del self.chaves[posicao]
+        self.valores = np.delete(self.valores, posicao, axis=0)
+        self.totais = np.delete(self.totais, posicao, axis=0)
+        self.imposto_acumulado = np.delete(self.imposto_acumulado, posicao)
+
+    def tendencias(self):
+        """Totais por ano, alíquota efetiva anual, sua variação em pontos percentuais e o imposto acumulado."""
+        rendimento, deducao, imposto = self.totais.T
+        aliquota = np.round(np.divide(imposto, rendimento, out=np.zeros_like(rendimento), where=rendimento > 0) * 100, 2)
+        variacao = np.diff(aliquota, prepend=np.nan)
+        return {
+            "ano": self.anos,
+            "rendimento": np.round(rendimento, 2),
+            "deducao": np.round(deducao, 2),
+            "imposto": np.round(imposto, 2),
+            "aliquota_efetiva": aliquota,
+            "variacao_aliquota": np.round(variacao, 2),
+            "imposto_acumulado": np.round(self.imposto_acumulado, 2),
+        }
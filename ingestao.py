@@ -0,0 +1,167 @@
+"""Entrada dos PDFs enviados: limites de tamanho, ZIPs em fluxo e leitura sem cópias extras.
+
+PDFs enviados direto já estão na memória do Streamlit: o hash é calculado sobre
+o próprio buffer (`getbuffer`, sem copiar) e a extração lê desse mesmo buffer.
+Um ZIP é aberto sem extrair tudo: cada PDF de dentro é descompactado em blocos
+para um arquivo temporário anônimo, lido via mmap e descartado antes do
+próximo, então a memória não cresce com a quantidade de arquivos.
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import zipfile
+from pathlib import PurePosixPath
+
+from cache import CACHE_PACOTES, hash_conteudo
+from demonstrativo import ler_demonstrativo
+
+MB = 1024 * 1024
+LIMITE_ARQUIVO = int(os.environ.get("CARNELEAO_LIMITE_ARQUIVO_MB", 20)) * MB
+LIMITE_SESSAO = int(os.environ.get("CARNELEAO_LIMITE_SESSAO_MB", 200)) * MB
+TAMANHO_BLOCO = 1 * MB
+
+
+class _LimiteSessao(Exception):
+    pass
+
+
+def _copiar_limitado(origem, destino, limite, nome):
+    """Copia em blocos calculando o hash; para assim que passar do limite (ZIPs podem declarar tamanhos falsos)."""
+    resumo = hashlib.sha256()
+    total = 0
+    while bloco := origem.read(TAMANHO_BLOCO):
+        total += len(bloco)
+        if total > limite:
+            raise ValueError(f"{nome} passa do limite de {limite // MB} MB por arquivo")
+        resumo.update(bloco)
+        destino.write(bloco)
+    return resumo.hexdigest(), total
+
+
+def _ler_mapeado(arquivo, motor=None):
+    arquivo.flush()
+    if os.fstat(arquivo.fileno()).st_size == 0:
+        raise ValueError("arquivo vazio")
+    # Cópia-na-escrita: nada é escrito, mas o mapa precisa ser gravável para o PDFium usá-lo como buffer
+    with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_COPY) as mapa:
+        return ler_demonstrativo(mapa, motor)
+
+
+def _ler_membro(pacote, info, limite, motor=None):
+    with pacote.open(info) as origem, tempfile.TemporaryFile() as temporario:
+        _copiar_limitado(origem, temporario, limite, info.filename)
+        return _ler_mapeado(temporario, motor)
+
+
+def _membros_pdf(pacote):
+    for info in pacote.infolist():
+        caminho = PurePosixPath(info.filename)
+        if not info.is_dir() and caminho.suffix.lower() == ".pdf" and "__MACOSX" not in caminho.parts:
+            yield info
+
+
+def _ingerir_zip(arquivo, chave_zip, obter_ou_ler, limite_arquivo, restante, motor):
+    """Gera (nome, chave, demonstrativo, erro, bytes) de cada PDF do ZIP, um por vez.
+
+    O índice membro -> hash fica em CACHE_PACOTES: num rerun com o mesmo ZIP os
+    demonstrativos vêm direto do cache/armazém, sem descompactar de novo.
+    """
+    indice = CACHE_PACOTES.obter(chave_zip)
+    novo_indice = {} if indice is None else None
+    arquivo.seek(0)
+    with zipfile.ZipFile(arquivo) as pacote:
+        for info in _membros_pdf(pacote):
+            nome = f"{arquivo.name}/{info.filename}"
+            if info.file_size > limite_arquivo:
+                yield nome, None, None, f"passa do limite de {limite_arquivo // MB} MB por arquivo", 0
+                continue
+            if info.file_size > restante:
+                raise _LimiteSessao(nome)
+            restante -= info.file_size
+            try:
+                if indice is not None and info.filename in indice:
+                    chave = indice[info.filename]
+                    demonstrativo = obter_ou_ler(chave, lambda: _ler_membro(pacote, info, limite_arquivo, motor))
+                else:
+                    with pacote.open(info) as origem, tempfile.TemporaryFile() as temporario:
+                        chave, _ = _copiar_limitado(origem, temporario, limite_arquivo, info.filename)
+                        demonstrativo = obter_ou_ler(chave, lambda: _ler_mapeado(temporario, motor))
+                    if novo_indice is not None:
+                        novo_indice[info.filename] = chave
+            except Exception as e:
+                yield nome, None, None, f"{type(e).__name__}: {e}", info.file_size
+                continue
+            yield nome, chave, demonstrativo, None, info.file_size
+    if novo_indice is not None:
+        CACHE_PACOTES.guardar(chave_zip, novo_indice)
+
+
+def ingerir(arquivos, obter_ou_ler, limite_arquivo=LIMITE_ARQUIVO, limite_sessao=LIMITE_SESSAO, motor=None):
+    """Gera (nome, chave, demonstrativo, erro) para cada PDF enviado, inclusive os de dentro de ZIPs.
+
+    `obter_ou_ler(chave, ler)` devolve o demonstrativo já conhecido pela chave
+    (hash do conteúdo) ou chama `ler()` para extraí-lo. Os limites são checados
+    antes de qualquer extração; um arquivo recusado ou com erro não interrompe
+    os demais, mas ao estourar o limite da sessão os restantes são ignorados.
+    """
+    restante = limite_sessao
+    for arquivo in arquivos:
+        with arquivo.getbuffer() as buffer:
+            chave = hash_conteudo(buffer)
+
+        if PurePosixPath(arquivo.name).suffix.lower() == ".zip":
+            # Do ZIP conta só o tamanho descompactado de cada PDF, o que de fato passa pela memória
+            try:
+                for nome, chave_pdf, demonstrativo, erro, tamanho in _ingerir_zip(arquivo, chave, obter_ou_ler, limite_arquivo, restante, motor):
+                    restante -= tamanho
+                    yield nome, chave_pdf, demonstrativo, erro
+            except zipfile.BadZipFile as e:
+                yield arquivo.name, None, None, f"ZIP inválido: {e}"
+            except _LimiteSessao as e:
+                yield str(e), None, None, f"limite de {limite_sessao // MB} MB por sessão atingido"
+                return
+            continue
+
+        if arquivo.size > restante:
+            yield arquivo.name, None, None, f"limite de {limite_sessao // MB} MB por sessão atingido"
+            return
+        if arquivo.size > limite_arquivo:
+            yield arquivo.name, None, None, f"passa do limite de {limite_arquivo // MB} MB por arquivo"
+            continue
+        restante -= arquivo.size
+
+        def ler(arquivo=arquivo):
+            arquivo.seek(0)
+            return ler_demonstrativo(arquivo, motor)
+
+        try:
+            yield arquivo.name, chave, obter_ou_ler(chave, ler), None
+        except Exception as e:
+            yield arquivo.name, None, None, f"{type(e).__name__}: {e}"
+
+
+def contar_pdfs(arquivos):
+    """Quantos PDFs `ingerir` vai percorrer (os de dentro dos ZIPs contam um a um), lendo só o índice dos ZIPs."""
+    total = 0
+    for arquivo in arquivos:
+        if PurePosixPath(arquivo.name).suffix.lower() != ".zip":
+            total += 1
+            continue
+        try:
+            arquivo.seek(0)
+            with zipfile.ZipFile(arquivo) as pacote:
+                total += sum(1 for _ in _membros_pdf(pacote))
+        except zipfile.BadZipFile:
+            total += 1
+    return total
+
+
+def processar_envio(tarefa, arquivos, obter_ou_ler, **opcoes):
+    """Tarefa de fundo (ver tarefas.FilaTarefas): ingere os arquivos anotando o progresso e devolve a lista de `ingerir`."""
+    tarefa.progresso(0, contar_pdfs(arquivos))
+    resultados = []
+    for resultado in ingerir(arquivos, obter_ou_ler, **opcoes):
+        resultados.append(resultado)
+        tarefa.progresso(len(resultados))
+    return resultados
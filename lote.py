@@ -0,0 +1,218 @@
+"""Processamento em lote de demonstrativos do Carnê-Leão.
+
+Uso:
+    python lote.py PASTA_DOS_PDFS --saida resultado.csv
+    python lote.py PASTA_DOS_PDFS --saida resultado.json --processos 8 --motor pdfium
+    python lote.py PASTA_DOS_PDFS --paridade pdfium
+    python lote.py PASTA_DOS_PDFS --saida ranking.csv --comparativo-pj
+
+A extração roda em paralelo (um processo por núcleo, por padrão). Cada arquivo
+concluído é anotado em um arquivo de progresso (`<saida>.progresso.jsonl`);
+se a execução for interrompida, rodar o mesmo comando de novo retoma de onde
+parou, pulando os PDFs já extraídos com sucesso.
+
+`--comparativo-pj` acrescenta o custo mensal como PF e como PJ de cada cliente,
+a economia anual estimada e o pró-labore ótimo, e ordena a saída da maior para a menor economia.
+
+`--paridade MOTOR` extrai cada PDF da pasta com o motor de referência
+(pdfplumber) e com MOTOR, e lista os arquivos em que os campos divergem.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from demonstrativo import MOTORES, Demonstrativo, ler_demonstrativo
+from simulacao import comparar_pf_pj, medias_mensais, otimizar_prolabore
+
+
+def listar_pdfs(pasta):
+    return sorted(p for p in Path(pasta).rglob("*") if p.suffix.lower() == ".pdf")
+
+
+def processar_arquivo(caminho, motor=None):
+    """Extrai um PDF; roda dentro dos processos do pool, por isso devolve só tipos serializáveis."""
+    try:
+        return str(caminho), ler_demonstrativo(caminho, motor).como_dict(), None
+    except Exception as e:
+        return str(caminho), None, f"{type(e).__name__}: {e}"
+
+
+def processar_em_paralelo(caminhos, processos=None, motor=None, tarefa=processar_arquivo):
+    """Gera o resultado de `tarefa` para cada arquivo à medida que termina, em qualquer ordem."""
+    tarefa = partial(tarefa, motor=motor)
+    processos = processos or os.cpu_count() or 1
+    if processos == 1:
+        for caminho in caminhos:
+            yield tarefa(caminho)
+        return
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [executor.submit(tarefa, caminho) for caminho in caminhos]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+
+
+def processar_pasta(pasta, processos=None, motor=None):
+    """Gera (caminho, Demonstrativo ou None, erro ou None) para cada PDF da pasta."""
+    for caminho, dados, erro in processar_em_paralelo(listar_pdfs(pasta), processos, motor):
+        yield caminho, Demonstrativo.de_dict(dados) if dados else None, erro
+
+
+def comparar_motores(caminho, motor, referencia="pdfplumber"):
+    """Lista as divergências entre o motor de referência e `motor` para um PDF."""
+    _, esperado, erro_esperado = processar_arquivo(caminho, referencia)
+    _, obtido, erro_obtido = processar_arquivo(caminho, motor)
+    if erro_esperado or erro_obtido:
+        if (erro_esperado is None) != (erro_obtido is None):
+            return str(caminho), [f"erro: {referencia}={erro_esperado!r} {motor}={erro_obtido!r}"]
+        return str(caminho), []
+
+    divergencias = [
+        f"{campo}: {esperado[campo]!r} != {obtido[campo]!r}"
+        for campo in ("nome", "cpf") if esperado[campo] != obtido[campo]
+    ]
+    for mes, dados in esperado["dados_mensais"].items():
+        for campo, valor in dados.items():
+            valor_obtido = obtido["dados_mensais"].get(mes, {}).get(campo)
+            if valor != valor_obtido:
+                divergencias.append(f"{campo}_{mes}: {valor!r} != {valor_obtido!r}")
+    return str(caminho), divergencias
+
+
+def verificar_paridade(pasta, motor, processos=None):
+    """Extrai a pasta com os dois motores; devolve a quantidade de arquivos divergentes."""
+    divergentes = 0
+    total = 0
+    for caminho, divergencias in processar_em_paralelo(listar_pdfs(pasta), processos, motor, tarefa=comparar_motores):
+        total += 1
+        if divergencias:
+            divergentes += 1
+            print(f"DIVERGE {caminho}:", file=sys.stderr)
+            for divergencia in divergencias:
+                print(f"    {divergencia}", file=sys.stderr)
+    print(f"Paridade pdfplumber x {motor}: {total - divergentes}/{total} arquivos idênticos.")
+    return divergentes
+
+
+def carregar_progresso(caminho_progresso):
+    """Lê o arquivo de progresso de uma execução anterior: {caminho: dados} dos arquivos já extraídos."""
+    concluidos = {}
+    if not os.path.exists(caminho_progresso):
+        return concluidos
+    with open(caminho_progresso, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                # Última linha truncada por uma interrupção no meio da escrita
+                continue
+            if registro["erro"] is None:
+                concluidos[registro["arquivo"]] = registro["dados"]
+    return concluidos
+
+
+def comparativo_pj(demonstrativos, despesas_pessoais=0.0):
+    """Comparativo PF x PJ de todos os clientes de uma vez, com as médias mensais de cada um."""
+    valores = np.array([d.matriz() for d in demonstrativos]).reshape(-1, 3, 12)
+    rendimentos, deducoes = valores[:, 0], valores[:, 1]
+    receita_mensal = medias_mensais(rendimentos)
+    comparativo = comparar_pf_pj(receita_mensal, medias_mensais(deducoes), despesas_pessoais)
+    otimo = otimizar_prolabore(receita_mensal, despesas_pessoais)
+    colunas = ("receita_mensal", "despesas_consultorio", "tipo_pf", "custo_total_pf", "custo_total_pj", "economia_anual")
+    linhas = []
+    for i in range(len(demonstrativos)):
+        linha = {coluna: comparativo[coluna][i].item() for coluna in colunas}
+        linha["prolabore_otimo"] = otimo["prolabore"][i].item()
+        linha["custo_total_pj_otimo"] = otimo["custo_total_pj"][i].item()
+        linhas.append({coluna: round(v, 2) if isinstance(v, float) else v for coluna, v in linha.items()})
+    return linhas
+
+
+def gravar_csv(resultados, destino, extras=None):
+    linhas = [{"arquivo": str(caminho), **demonstrativo.como_linha()} for caminho, demonstrativo in resultados]
+    for linha, extra in zip(linhas, extras or []):
+        linha.update(extra)
+    if not linhas:
+        return
+    with open(destino, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.DictWriter(f, fieldnames=list(linhas[0].keys()))
+        escritor.writeheader()
+        escritor.writerows(linhas)
+
+
+def gravar_json(resultados, destino, extras=None):
+    registros = [
+        {"arquivo": str(caminho), "nome": d.nome, "cpf": d.cpf, "ano": d.ano, "totais": d.totais(), "dados_mensais": d.dados_mensais}
+        for caminho, d in resultados
+    ]
+    for registro, extra in zip(registros, extras or []):
+        registro["comparativo_pj"] = extra
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(registros, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extrai os demonstrativos do Carnê-Leão de uma pasta para CSV ou JSON.")
+    parser.add_argument("pasta", help="pasta com os PDFs (busca recursiva)")
+    parser.add_argument("--saida", help="arquivo de saída (.csv ou .json)")
+    parser.add_argument("--processos", type=int, default=None, help="processos de extração (padrão: número de núcleos)")
+    parser.add_argument("--motor", choices=list(MOTORES), default=None, help="motor de extração de texto (padrão: pdfplumber)")
+    parser.add_argument("--paridade", choices=list(MOTORES), default=None, metavar="MOTOR",
+                        help="compara MOTOR com o pdfplumber na pasta, sem gerar saída")
+    parser.add_argument("--comparativo-pj", action="store_true", help="inclui o comparativo PF x PJ e ordena pela economia")
+    parser.add_argument("--despesas-pessoais", type=float, default=0.0, help="despesas pessoais mensais usadas no comparativo")
+    parser.add_argument("--progresso", default=None, help="arquivo de progresso para retomada (padrão: <saida>.progresso.jsonl)")
+    parser.add_argument("--do-zero", action="store_true", help="ignora o progresso de execuções anteriores")
+    args = parser.parse_args(argv)
+
+    if args.paridade:
+        return 1 if verificar_paridade(args.pasta, args.paridade, args.processos) else 0
+    if not args.saida:
+        parser.error("--saida é obrigatório (exceto com --paridade)")
+
+    caminho_progresso = args.progresso or f"{args.saida}.progresso.jsonl"
+    if args.do_zero and os.path.exists(caminho_progresso):
+        os.remove(caminho_progresso)
+
+    concluidos = carregar_progresso(caminho_progresso)
+    pendentes = [p for p in listar_pdfs(args.pasta) if str(p) not in concluidos]
+    if concluidos:
+        print(f"Retomando: {len(concluidos)} já extraídos, {len(pendentes)} pendentes.")
+
+    falhas = 0
+    with open(caminho_progresso, "a", encoding="utf-8") as progresso:
+        for caminho, dados, erro in processar_em_paralelo(pendentes, args.processos, args.motor):
+            progresso.write(json.dumps({"arquivo": caminho, "dados": dados, "erro": erro}, ensure_ascii=False) + "\n")
+            progresso.flush()
+            if erro:
+                falhas += 1
+                print(f"ERRO {caminho}: {erro}", file=sys.stderr)
+            else:
+                concluidos[caminho] = dados
+
+    resultados = [(caminho, Demonstrativo.de_dict(dados)) for caminho, dados in sorted(concluidos.items())]
+    extras = None
+    if args.comparativo_pj and resultados:
+        extras = comparativo_pj([d for _, d in resultados], args.despesas_pessoais)
+        ordem = sorted(range(len(resultados)), key=lambda i: extras[i]["economia_anual"], reverse=True)
+        resultados = [resultados[i] for i in ordem]
+        extras = [extras[i] for i in ordem]
+
+    if args.saida.lower().endswith(".json"):
+        gravar_json(resultados, args.saida, extras)
+    else:
+        gravar_csv(resultados, args.saida, extras)
+
+    print(f"{len(resultados)} demonstrativos processados, {falhas} com erro.")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Instrumentação: tempo por etapa, acertos de cache e pico de memória por extração.
+
+Tudo fica em um registro em memória (REGISTRO), exportado no formato texto do
+Prometheus — pela rota /metricas da API ou, no dashboard, por um servidor HTTP
+à parte quando CARNELEAO_METRICAS_PORTA está definida. Cada etapa cronometrada
+também sai como linha de log (logger "carneleao.etapas", nível DEBUG) e é
+anotada na execução corrente, que o painel de depuração do app mostra.
+
+O pico de memória usa tracemalloc, que deixa as alocações mais lentas; só é
+medido com CARNELEAO_MEDIR_MEMORIA=1. É o pico do processo durante a extração
+(com extrações simultâneas, as outras entram na conta) e não enxerga memória
+alocada fora do Python, como a do PDFium.
+"""
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+LIMITES_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_BYTES = tuple(2 ** n * 1024 * 1024 for n in range(0, 11))
+LIMITES_PAYLOAD = tuple(2 ** n * 1024 for n in range(0, 11))
+
+DESCRICOES = {
+    "carneleao_etapa_segundos": ("histogram", "Duração de cada etapa do processamento"),
+    "carneleao_cache_total": ("counter", "Consultas aos caches em memória, por resultado"),
+    "carneleao_cache_descartes_total": ("counter", "Itens descartados dos caches em memória por falta de espaço"),
+    "carneleao_cache_bytes": ("gauge", "Memória estimada dos caches compartilhados do processo"),
+    "carneleao_extracao_pico_memoria_bytes": ("histogram", "Pico de memória Python durante a extração de um PDF"),
+    "carneleao_grafico_bytes": ("histogram", "Tamanho de cada gráfico enviado ao navegador"),
+    "carneleao_processo_memoria_residente_bytes": ("gauge", "Memória residente do processo"),
+    "carneleao_tarefas_pendentes": ("gauge", "Tarefas na fila ou executando"),
+}
+
+logger = logging.getLogger("carneleao.etapas")
+
+if os.environ.get("CARNELEAO_MEDIR_MEMORIA") == "1" and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class _Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+def _rotulos(rotulos):
+    return "{" + ",".join(f'{chave}="{valor}"' for chave, valor in rotulos) + "}" if rotulos else ""
+
+
+class Registro:
+    """Contadores, histogramas e medidores (calculados na hora da exportação), seguros entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+        self._medidores = {}
+
+    def contar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, valor, limites=LIMITES_SEGUNDOS, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = _Histograma(limites)
+            histograma.observar(valor)
+
+    def medidor(self, nome, funcao):
+        """Registra um valor lido na exportação (ex.: memória do processo, tamanho da fila)."""
+        with self._lock:
+            self._medidores[nome] = funcao
+
+    def contadores(self, nome):
+        with self._lock:
+            return {rotulos: valor for (n, rotulos), valor in self._contadores.items() if n == nome}
+
+    def texto(self):
+        """Exportação no formato texto do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            contadores = dict(self._contadores)
+            histogramas = {chave: (h.limites, list(h.contagens), h.soma, h.total) for chave, h in self._histogramas.items()}
+            medidores = dict(self._medidores)
+
+        linhas = []
+        vistos = set()
+
+        def cabecalho(nome, tipo):
+            if nome not in vistos:
+                vistos.add(nome)
+                linhas.append(f"# HELP {nome} {DESCRICOES.get(nome, (tipo, nome))[1]}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+
+        for (nome, rotulos), valor in sorted(contadores.items()):
+            cabecalho(nome, "counter")
+            linhas.append(f"{nome}{_rotulos(rotulos)} {valor}")
+        for (nome, rotulos), (limites, contagens, soma, total) in sorted(histogramas.items()):
+            cabecalho(nome, "histogram")
+            acumulado = 0
+            for limite, contagem in zip((*limites, "+Inf"), contagens):
+                acumulado += contagem
+                linhas.append(f"{nome}_bucket{_rotulos((*rotulos, ('le', limite)))} {acumulado}")
+            linhas.append(f"{nome}_sum{_rotulos(rotulos)} {soma}")
+            linhas.append(f"{nome}_count{_rotulos(rotulos)} {total}")
+        for nome, funcao in sorted(medidores.items()):
+            cabecalho(nome, "gauge")
+            linhas.append(f"{nome} {funcao()}")
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRO = Registro()
+
+
+def _memoria_residente():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+REGISTRO.medidor("carneleao_processo_memoria_residente_bytes", _memoria_residente)
+
+
+# Etapas da execução corrente (um rerun do script, uma tarefa da fila), para o painel de depuração
+_execucao = ContextVar("carneleao_execucao", default=None)
+
+
+def iniciar_execucao():
+    """Passa a anotar as etapas cronometradas neste contexto; devolve a lista que vai sendo preenchida."""
+    etapas = []
+    _execucao.set(etapas)
+    return etapas
+
+
+@contextmanager
+def cronometrar(etapa, **rotulos):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        REGISTRO.observar("carneleao_etapa_segundos", segundos, etapa=etapa, **rotulos)
+        etapas = _execucao.get()
+        if etapas is not None:
+            etapas.append({"etapa": etapa, "ms": round(segundos * 1000, 2), **rotulos})
+        logger.debug("etapa=%s ms=%.2f %s", etapa, segundos * 1000, " ".join(f"{k}={v}" for k, v in rotulos.items()))
+
+
+def cronometrado(etapa):
+    """Decorador: cronometra cada chamada da função como `etapa`."""
+    def decorador(funcao):
+        @wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with cronometrar(etapa):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+@contextmanager
+def medir_pico_memoria():
+    """Pico de memória Python do bloco, se o tracemalloc estiver ligado; anotado na última etapa da execução."""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        pico = tracemalloc.get_traced_memory()[1]
+        REGISTRO.observar("carneleao_extracao_pico_memoria_bytes", pico, limites=LIMITES_BYTES)
+        etapas = _execucao.get()
+        if etapas:
+            etapas[-1]["pico_memoria_mb"] = round(pico / 2 ** 20, 2)
+
+
+def registrar_payload(grafico, formato, tamanho):
+    """Bytes que um gráfico leva ao navegador; anotado na última etapa da execução (a que o exibiu)."""
+    REGISTRO.observar("carneleao_grafico_bytes", tamanho, limites=LIMITES_PAYLOAD, grafico=grafico, formato=formato)
+    etapas = _execucao.get()
+    if etapas:
+        etapas[-1]["kb"] = round(tamanho / 1024, 1)
+
+
+_servidor = None
+_servidor_lock = threading.Lock()
+
+
+def servir(porta, host="0.0.0.0"):
+    """Expõe REGISTRO em http://host:porta/metrics numa thread; chamadas repetidas reaproveitam o servidor."""
+    global _servidor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Metricas(BaseHTTPRequestHandler):
+        def do_GET(self):
+            corpo = REGISTRO.texto().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    with _servidor_lock:
+        if _servidor is None:
+            _servidor = ThreadingHTTPServer((host, porta), _Metricas)
+            threading.Thread(target=_servidor.serve_forever, name="carneleao-metricas", daemon=True).start()
+    return _servidor
+
+
+def servir_se_configurado():
+    porta = os.environ.get("CARNELEAO_METRICAS_PORTA")
+    if porta:
+        servir(int(porta))
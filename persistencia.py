@@ -0,0 +1,117 @@
+"""Armazenamento local dos demonstrativos já extraídos, em SQLite.
+
+Cada PDF vira uma linha identificada pelo hash do conteúdo, com nome, CPF, ano
+e as quatro séries mensais (rendimento, dedução, imposto, alíquota) guardadas
+juntas como um bloco float64 de 4 x 12. Reenviar o mesmo arquivo não duplica
+nada e, para um cliente que volta, o dashboard lê daqui em vez de reabrir o PDF.
+"""
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from demonstrativo import MESES, Demonstrativo
+from historico import Historico
+
+CAMINHO_PADRAO = os.environ.get("CARNELEAO_BANCO", os.path.join(os.path.dirname(__file__), "carneleao.sqlite3"))
+SERIES = ("rendimento", "deducao", "imposto", "aliquota")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS demonstrativos (
+    hash TEXT PRIMARY KEY,
+    cpf TEXT,
+    ano INTEGER,
+    nome TEXT,
+    valores BLOB NOT NULL,
+    criado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS demonstrativos_cpf_ano ON demonstrativos (cpf, ano);
+"""
+
+
+def normalizar_cpf(texto):
+    """CPF no formato do demonstrativo (000.000.000-00), aceitando só os dígitos; outro texto volta como veio."""
+    digitos = "".join(c for c in texto if c.isdigit())
+    if len(digitos) != 11:
+        return texto
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+
+
+def _para_blob(demonstrativo):
+    return np.vstack([demonstrativo.matriz(), demonstrativo.aliquotas]).astype("<f8").tobytes()
+
+
+def _de_linha(nome, cpf, ano, valores):
+    # A alíquota gravada (quarta série) é derivada de novo pelo Demonstrativo
+    series = np.frombuffer(valores, dtype="<f8").reshape(len(SERIES), len(MESES))
+    return Demonstrativo(nome=nome, cpf=cpf, valores=series[:3], ano=ano)
+
+
+class Armazem:
+    """Demonstrativos extraídos, indexados por hash do conteúdo e por (CPF, ano).
+
+    Uma conexão por instância, compartilhada entre as threads do Streamlit sob
+    um lock; o modo WAL deixa outros processos lerem enquanto um grava.
+    """
+
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        with self._lock, self._conexao:
+            if caminho != ":memory:":
+                self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.executescript(_ESQUEMA)
+
+    def obter(self, chave):
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT nome, cpf, ano, valores FROM demonstrativos WHERE hash = ?", (chave,)
+            ).fetchone()
+        return _de_linha(*linha) if linha else None
+
+    def guardar(self, chave, demonstrativo):
+        """Grava o demonstrativo; devolve False se esse conteúdo já estava armazenado."""
+        with self._lock, self._conexao:
+            cursor = self._conexao.execute(
+                "INSERT OR IGNORE INTO demonstrativos (hash, cpf, ano, nome, valores, criado_em) VALUES (?, ?, ?, ?, ?, ?)",
+                (chave, demonstrativo.cpf, demonstrativo.ano, demonstrativo.nome, _para_blob(demonstrativo), time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def obter_ou_ler(self, chave, ler):
+        """Demonstrativo armazenado sob `chave`; se não houver, chama `ler()` e grava o resultado."""
+        demonstrativo = self.obter(chave)
+        if demonstrativo is None:
+            demonstrativo = ler()
+            self.guardar(chave, demonstrativo)
+        return demonstrativo
+
+    def por_cpf(self, cpf):
+        """Pares (hash, demonstrativo) do CPF, por ano e, no mesmo ano, do mais antigo ao mais recente."""
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT hash, nome, cpf, ano, valores FROM demonstrativos WHERE cpf = ? ORDER BY ano, criado_em", (cpf,)
+            ).fetchall()
+        return [(chave, _de_linha(*resto)) for chave, *resto in linhas]
+
+    def historico(self, cpf):
+        """Historico do CPF com todos os anos armazenados; o envio mais recente de cada ano prevalece."""
+        historico = Historico()
+        for chave, demonstrativo in self.por_cpf(cpf):
+            if demonstrativo.ano is not None:
+                historico.adicionar(demonstrativo, chave)
+        return historico
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+
+@lru_cache(maxsize=1)
+def armazem_padrao():
+    """Armazém em CAMINHO_PADRAO, aberto uma vez por processo e reaproveitado entre os reruns."""
+    return Armazem()
@@ -0,0 +1,165 @@
+"""Relatório em PDF do demonstrativo, gerado no servidor, sem navegador.
+
+Uso:
+    python relatorio.py PASTA_DOS_PDFS --saida PASTA_DOS_RELATORIOS --processos 8 --motor pdfium
+
+Gera um relatório por demonstrativo (resumo, gráficos, medidor da alíquota e
+comparativo PF x PJ), nas mesmas subpastas em que o PDF estava. Os gráficos são
+renderizados com matplotlib no próprio processo e reaproveitados do cache de
+gráficos quando já existem.
+"""
+import argparse
+import io
+import os
+import sys
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from cache import hash_conteudo
+from demonstrativo import MESES, MOTORES, ler_demonstrativo
+from estaticos import COR_PRIMARIA, COR_SECUNDARIA, carregar_logo, formatar_reais
+from graficos import grafico_aliquota, grafico_comparativo, grafico_medidor, grafico_valores
+from lote import listar_pdfs, processar_em_paralelo
+from simulacao import comparar_pf_pj, medias_mensais
+
+LARGURA_UTIL = A4[0] - 3 * cm
+
+
+def _imagem(png, largura):
+    imagem = Image(io.BytesIO(png))
+    imagem.drawHeight = largura * imagem.imageHeight / imagem.imageWidth
+    imagem.drawWidth = largura
+    return imagem
+
+
+def _tabela(linhas, larguras):
+    tabela = Table(linhas, colWidths=larguras)
+    tabela.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor(COR_PRIMARIA)),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cccccc")),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f2f9fb")]),
+    ]))
+    return tabela
+
+
+def gerar_relatorio(demonstrativo, chave_dados, despesas_pessoais=0.0):
+    """Bytes do PDF do relatório; `chave_dados` identifica o demonstrativo no cache de gráficos."""
+    meses = MESES
+    rendimentos, deducoes, impostos = demonstrativo.matriz().tolist()
+    aliquotas = demonstrativo.aliquotas.tolist()
+    media_aliquota = round(float(np.mean(aliquotas)), 2)
+
+    estilos = getSampleStyleSheet()
+    titulo = estilos["Title"].clone("TituloRelatorio", textColor=colors.HexColor(COR_PRIMARIA), alignment=0)
+    secao = estilos["Heading2"].clone("SecaoRelatorio", textColor=colors.HexColor(COR_PRIMARIA))
+
+    cabecalho = [Paragraph("Relatório Carnê-Leão", titulo), Paragraph(
+        f"<b>{demonstrativo.nome or 'Nome não identificado'}</b> — CPF {demonstrativo.cpf or '-'}", estilos["Normal"]
+    )]
+    logo = carregar_logo()
+    if logo:
+        cabecalho = Table([[_imagem(logo, 2.2 * cm), cabecalho]], colWidths=[2.6 * cm, LARGURA_UTIL - 2.6 * cm])
+        cabecalho.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "MIDDLE")]))
+        cabecalho = [cabecalho]
+
+    elementos = [*cabecalho, Spacer(1, 0.5 * cm), Paragraph("Resumo", secao)]
+    elementos.append(_tabela([
+        ["Total Recebido", "Total de Impostos", "Alíquota Média"],
+        [formatar_reais(sum(rendimentos)), formatar_reais(sum(impostos)), f"{media_aliquota:.2f}".replace(".", ",") + "%"],
+    ], [LARGURA_UTIL / 3] * 3))
+
+    metade = LARGURA_UTIL / 2 - 0.2 * cm
+    elementos += [
+        Paragraph("Comparativo de Valores e Evolução da Alíquota", secao),
+        Table([[
+            _imagem(grafico_valores(chave_dados, meses, rendimentos, deducoes, impostos), metade),
+            _imagem(grafico_aliquota(chave_dados, meses, aliquotas), metade),
+        ]]),
+        Paragraph("Alíquota Efetiva Média", secao),
+        _imagem(grafico_medidor(chave_dados, meses, media_aliquota), 7 * cm),
+    ]
+
+    comparativo = comparar_pf_pj(float(medias_mensais(rendimentos)), float(medias_mensais(deducoes)), despesas_pessoais)
+    elementos += [
+        Paragraph("Simulação PF x PJ", secao),
+        _tabela([
+            ["Item", "Mensal", "Anual"],
+            [f"Custo PF ({comparativo['tipo_pf']})", formatar_reais(comparativo["custo_total_pf"]), formatar_reais(comparativo["custo_total_pf"] * 12)],
+            ["Simples Nacional", formatar_reais(comparativo["simples_pj"]), formatar_reais(comparativo["simples_pj"] * 12)],
+            ["Pró-labore", formatar_reais(comparativo["prolabore"]), formatar_reais(comparativo["prolabore"] * 12)],
+            ["INSS sobre pró-labore", formatar_reais(comparativo["inss_prolabore"]), formatar_reais(comparativo["inss_prolabore"] * 12)],
+            ["IR a restituir do pró-labore", formatar_reais(comparativo["ir_restituir"]), formatar_reais(comparativo["ir_restituir"] * 12)],
+            ["Custo PJ", formatar_reais(comparativo["custo_total_pj"]), formatar_reais(comparativo["custo_total_pj"] * 12)],
+        ], [LARGURA_UTIL * 0.5, LARGURA_UTIL * 0.25, LARGURA_UTIL * 0.25]),
+        Spacer(1, 0.3 * cm),
+        _imagem(grafico_comparativo(comparativo["custo_total_pf"] * 12, comparativo["custo_total_pj"] * 12), 9 * cm),
+    ]
+    economia = comparativo["economia_anual"]
+    conclusao = (
+        f"Migrar para PJ gera economia estimada de {formatar_reais(economia)} por ano."
+        if economia > 0 else
+        f"No cenário atual, PF ainda é mais vantajoso em cerca de {formatar_reais(abs(economia))} ao ano."
+    )
+    elementos.append(Paragraph(conclusao, estilos["Normal"].clone("Conclusao", textColor=colors.HexColor(COR_SECUNDARIA))))
+
+    buffer = io.BytesIO()
+    documento = SimpleDocTemplate(
+        buffer, pagesize=A4, leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm,
+        title=f"Relatório Carnê-Leão - {demonstrativo.nome or ''}", author="Declara Psi",
+    )
+    documento.build(elementos)
+    return buffer.getvalue()
+
+
+def gerar_relatorio_arquivo(caminho, pasta_saida, pasta_origem, despesas_pessoais=0.0, motor=None):
+    """Lê um demonstrativo e grava seu relatório; roda dentro dos processos do pool.
+
+    O relatório repete as subpastas de `pasta_origem`, para dois PDFs de mesmo nome
+    em pastas de clientes diferentes não gravarem um por cima do outro.
+    """
+    try:
+        conteudo = Path(caminho).read_bytes()
+        relatorio = gerar_relatorio(ler_demonstrativo(conteudo, motor), hash_conteudo(conteudo), despesas_pessoais)
+        destino = Path(pasta_saida) / Path(caminho).relative_to(pasta_origem).with_suffix(".pdf")
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        with open(destino, "wb") as f:
+            f.write(relatorio)
+        return str(caminho), str(destino), None
+    except Exception as e:
+        return str(caminho), None, f"{type(e).__name__}: {e}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera o relatório em PDF de cada demonstrativo de uma pasta.")
+    parser.add_argument("pasta", help="pasta com os demonstrativos (busca recursiva)")
+    parser.add_argument("--saida", required=True, help="pasta onde os relatórios serão gravados")
+    parser.add_argument("--processos", type=int, default=None, help="processos em paralelo (padrão: número de núcleos)")
+    parser.add_argument("--motor", choices=list(MOTORES), default=None, help="motor de extração de texto (padrão: pdfplumber)")
+    parser.add_argument("--despesas-pessoais", type=float, default=0.0, help="despesas pessoais mensais usadas no comparativo")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.saida, exist_ok=True)
+    tarefa = partial(gerar_relatorio_arquivo, pasta_saida=args.saida, pasta_origem=args.pasta, despesas_pessoais=args.despesas_pessoais)
+    gerados = falhas = 0
+    for caminho, _, erro in processar_em_paralelo(listar_pdfs(args.pasta), args.processos, args.motor, tarefa=tarefa):
+        if erro:
+            falhas += 1
+            print(f"ERRO {caminho}: {erro}", file=sys.stderr)
+        else:
+            gerados += 1
+    print(f"{gerados} relatórios gerados em {args.saida}, {falhas} com erro.")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
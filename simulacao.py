@@ -0,0 +1,284 @@
+import numpy as np
+
+from tributos import LIMITES_SIMPLES, calcular_simples, tabela_ir
+
+# Custos fixos mensais
+CONTABILIDADE_PF = 289.00
+INSS_PF = 166.98
+CONTABILIDADE_PJ = 489.00
+TAXAS_PJ = 50.00
+
+# Pró-labore: mínimo de um salário mínimo ou 28% da receita (Fator R)
+PROLABORE_MINIMO = 1518.00
+FATOR_R = 0.28
+ALIQUOTA_INSS_PROLABORE = 0.11
+TETO_DEDUCAO_SIMPLIFICADA_MENSAL = 1396.20
+
+# Pesos mensais da receita, normalizados para média 1 em serie_mensal.
+# "ferias": janeiro e julho fracos, pico no 2º semestre
+PERFIS_RECEITA = {
+    "constante": np.ones(12),
+    "ferias": np.array([0.6, 0.9, 1.0, 1.0, 1.05, 1.0, 0.7, 1.0, 1.1, 1.1, 1.15, 0.9]),
+}
+
+
+def custos_pj(receita_mensal, prolabore, despesas_pessoais, tabela):
+    """Custo mensal da PJ no Simples para um pró-labore dado (arrays com formas compatíveis)."""
+    fator_r_atendido = prolabore >= receita_mensal * FATOR_R
+    anexo_simples = np.where(fator_r_atendido, "III", "V")
+    simples_pj = np.where(fator_r_atendido, calcular_simples(receita_mensal, "III"), calcular_simples(receita_mensal, "V"))
+    inss_prolabore = prolabore * ALIQUOTA_INSS_PROLABORE
+    base_ir_prolabore = prolabore - inss_prolabore
+    irrf_prolabore = tabela.calcular(base_ir_prolabore)
+
+    # Restituição do IR do pró-labore: dedução completa só compensa acima do teto simplificado
+    deducao_completa_pj = despesas_pessoais > TETO_DEDUCAO_SIMPLIFICADA_MENSAL
+    tipo_deducao_pj = np.where(deducao_completa_pj, "Completa", "Simplificada")
+    base_restituicao = np.where(deducao_completa_pj, base_ir_prolabore - despesas_pessoais, prolabore * 0.8)
+    ir_restituir = tabela.calcular(base_restituicao)
+
+    custo_total_pj = simples_pj + inss_prolabore + irrf_prolabore + CONTABILIDADE_PJ + TAXAS_PJ - (irrf_prolabore - ir_restituir)
+    return {
+        "anexo_simples": anexo_simples,
+        "simples_pj": simples_pj,
+        "prolabore": prolabore,
+        "inss_prolabore": inss_prolabore,
+        "base_ir_prolabore": base_ir_prolabore,
+        "irrf_prolabore": irrf_prolabore,
+        "tipo_deducao_pj": tipo_deducao_pj,
+        "base_restituicao": base_restituicao,
+        "ir_restituir": ir_restituir,
+        "custo_total_pj": custo_total_pj,
+    }
+
+
+def comparar_pf_pj(receita_mensal, despesas_consultorio, despesas_pessoais=0.0, ano=None):
+    """Custo mensal como PF (melhor entre completa e simplificada) e como PJ no Simples.
+
+    As entradas podem ser escalares ou arrays com a mesma forma (um cenário por
+    posição). Devolve um dict com todos os valores intermediários e finais, um
+    array por coluna — ou floats/strings, quando todas as entradas são escalares.
+    """
+    escalar = all(np.ndim(x) == 0 for x in (receita_mensal, despesas_consultorio, despesas_pessoais))
+    receita_mensal, despesas_consultorio, despesas_pessoais = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (receita_mensal, despesas_consultorio, despesas_pessoais))
+    )
+    tabela = tabela_ir(ano)
+
+    # Custo PF
+    base_completa = np.maximum(receita_mensal - despesas_consultorio - despesas_pessoais, 0)
+    ir_completa = tabela.calcular(base_completa)
+    custo_total_pf_completa = CONTABILIDADE_PF + INSS_PF + ir_completa
+
+    deducao_simplificada = np.minimum(receita_mensal * 0.2, tabela.limite_desconto_simplificado_anual / 12)
+    base_simplificada = np.maximum(receita_mensal - deducao_simplificada, 0)
+    ir_simplificada = tabela.calcular(base_simplificada)
+    custo_total_pf_simplificada = CONTABILIDADE_PF + INSS_PF + ir_simplificada
+
+    completa_compensa = custo_total_pf_completa < custo_total_pf_simplificada
+    custo_total_pf = np.where(completa_compensa, custo_total_pf_completa, custo_total_pf_simplificada)
+    tipo_pf = np.where(completa_compensa, "Completa", "Simplificada")
+
+    # Custo PJ
+    prolabore = np.maximum(PROLABORE_MINIMO, receita_mensal * FATOR_R)
+    pj = custos_pj(receita_mensal, prolabore, despesas_pessoais, tabela)
+
+    resultado = {
+        "receita_mensal": receita_mensal,
+        "despesas_consultorio": despesas_consultorio,
+        "despesas_pessoais": despesas_pessoais,
+        "deducao_completa": despesas_consultorio + despesas_pessoais + CONTABILIDADE_PF + INSS_PF,
+        "base_completa": base_completa,
+        "ir_completa": ir_completa,
+        "custo_total_pf_completa": custo_total_pf_completa,
+        "deducao_simplificada": deducao_simplificada,
+        "base_simplificada": base_simplificada,
+        "ir_simplificada": ir_simplificada,
+        "custo_total_pf_simplificada": custo_total_pf_simplificada,
+        "tipo_pf": tipo_pf,
+        "custo_total_pf": custo_total_pf,
+        **pj,
+        "economia_anual": (custo_total_pf - pj["custo_total_pj"]) * 12,
+    }
+    if escalar:
+        return {chave: np.asarray(valor).item() for chave, valor in resultado.items()}
+    return resultado
+
+
+def medias_mensais(valores):
+    """Média por cliente só dos meses com valor (> 0), como no dashboard; `valores` é clientes x meses."""
+    valores = np.asarray(valores, dtype=np.float64)
+    meses_com_valor = np.count_nonzero(valores > 0, axis=-1)
+    return np.divide(valores.sum(axis=-1), meses_com_valor, out=np.zeros(valores.shape[:-1]), where=meses_com_valor > 0)
+
+
+def varrer_sensibilidade(receitas, despesas_pessoais, despesas_consultorio=0.0, ano=None):
+    """Economia anual PJ x PF sobre a grade despesas pessoais (linhas) x receita mensal (colunas).
+
+    Devolve também os pontos da curva de equilíbrio (economia = 0), interpolados
+    entre as colunas onde o sinal da economia muda — inclusive nos saltos das
+    faixas do Simples e do piso do pró-labore — e as receitas onde esses saltos
+    acontecem.
+    """
+    receitas = np.asarray(receitas, dtype=np.float64)
+    despesas_pessoais = np.asarray(despesas_pessoais, dtype=np.float64)
+    economia = comparar_pf_pj(receitas[np.newaxis, :], despesas_consultorio, despesas_pessoais[:, np.newaxis], ano)["economia_anual"]
+
+    linhas, colunas = np.nonzero((economia[:, 1:] > 0) != (economia[:, :-1] > 0))
+    antes, depois = economia[linhas, colunas], economia[linhas, colunas + 1]
+    # Num salto (descontinuidade) a interpolação cai dentro do intervalo, o que basta na resolução da grade
+    fracao = np.divide(antes, antes - depois, out=np.full(antes.shape, 0.5), where=antes != depois)
+    receitas_equilibrio = receitas[colunas] + (receitas[colunas + 1] - receitas[colunas]) * fracao
+
+    return {
+        "receitas": receitas,
+        "despesas_pessoais": despesas_pessoais,
+        "economia_anual": economia,
+        "equilibrio_receita": receitas_equilibrio,
+        "equilibrio_despesas_pessoais": despesas_pessoais[linhas],
+        "saltos_receita": np.array([PROLABORE_MINIMO / FATOR_R, *LIMITES_SIMPLES]),
+    }
+
+
+def otimizar_prolabore(receita_mensal, despesas_pessoais=0.0, ano=None):
+    """Pró-labore que minimiza o custo total da PJ, entre o salário mínimo e a receita.
+
+    O custo é linear por partes no pró-labore, com quebras nas faixas do IR
+    (sobre o IRRF e sobre a base da restituição) e um salto no Fator R, onde o
+    Simples muda do Anexo V para o III. O mínimo está sempre em um desses pontos
+    ou nos extremos, então basta avaliar essa dúzia de candidatos por cliente —
+    o resultado é exato e vetorizado sobre quantos clientes vierem.
+    """
+    escalar = all(np.ndim(x) == 0 for x in (receita_mensal, despesas_pessoais))
+    receita_mensal, despesas_pessoais = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (receita_mensal, despesas_pessoais))
+    )
+    tabela = tabela_ir(ano)
+    fracao_liquida = 1 - ALIQUOTA_INSS_PROLABORE
+
+    minimo = np.full(receita_mensal.shape, PROLABORE_MINIMO)
+    maximo = np.maximum(receita_mensal, minimo)
+    formato = receita_mensal.shape + (len(tabela.limites),)
+    candidatos = np.concatenate([
+        minimo[..., np.newaxis],
+        (receita_mensal * FATOR_R)[..., np.newaxis],
+        maximo[..., np.newaxis],
+        np.broadcast_to(tabela.limites / fracao_liquida, formato),
+        (tabela.limites + despesas_pessoais[..., np.newaxis]) / fracao_liquida,
+        np.broadcast_to(tabela.limites / 0.8, formato),
+    ], axis=-1)
+    # Ordenados, o argmin desempata pelo menor pró-labore
+    candidatos = np.sort(np.clip(candidatos, minimo[..., np.newaxis], maximo[..., np.newaxis]), axis=-1)
+
+    custos = custos_pj(receita_mensal[..., np.newaxis], candidatos, despesas_pessoais[..., np.newaxis], tabela)["custo_total_pj"]
+    melhor = np.argmin(custos, axis=-1)[..., np.newaxis]
+    prolabore_otimo = np.take_along_axis(candidatos, melhor, axis=-1)[..., 0]
+
+    otimo = custos_pj(receita_mensal, prolabore_otimo, despesas_pessoais, tabela)
+    padrao = custos_pj(receita_mensal, np.maximum(PROLABORE_MINIMO, receita_mensal * FATOR_R), despesas_pessoais, tabela)
+    otimo["economia_anual_vs_padrao"] = (padrao["custo_total_pj"] - otimo["custo_total_pj"]) * 12
+    if escalar:
+        return {chave: np.asarray(valor).item() for chave, valor in otimo.items()}
+    return otimo
+
+
+def serie_mensal(media=None, perfil="constante", crescimento=0.0, realizados=None):
+    """Doze valores mensais projetados a partir de `media` (escalar, ou array para vários cenários).
+
+    `perfil` é um nome de PERFIS_RECEITA ou 12 pesos quaisquer; `crescimento` é a taxa mensal
+    composta (0.01 = 1% ao mês). Os pesos, já com o crescimento, são normalizados para que a
+    média do ano seja `media`. `realizados` são os primeiros meses do ano já conhecidos: entram
+    como estão e só os demais são projetados. Sem `media`, a projeção parte dos realizados com
+    valor, descontados o perfil e o crescimento.
+    """
+    pesos = np.asarray(PERFIS_RECEITA[perfil] if isinstance(perfil, str) else perfil, dtype=np.float64)
+    if pesos.shape != (12,) or pesos.sum() <= 0:
+        raise ValueError("O perfil precisa de 12 pesos com soma positiva")
+    pesos = pesos * (1 + crescimento) ** np.arange(12)
+    pesos /= pesos.mean()
+
+    realizados = np.asarray([] if realizados is None else realizados, dtype=np.float64)[:12]
+    conhecidos = realizados.size
+    if media is None:
+        com_valor = realizados > 0
+        media = (realizados[com_valor] / pesos[:conhecidos][com_valor]).mean() if com_valor.any() else 0.0
+    serie = np.asarray(media, dtype=np.float64)[..., np.newaxis] * pesos
+    serie[..., :conhecidos] = realizados
+    return serie
+
+
+def projetar_ano(receitas, despesas=0.0, ano=None):
+    """Carnê-Leão mês a mês sobre vetores de 12 meses (ou cenários x 12 meses), numa só passada.
+
+    Cada mês deduz as despesas do livro-caixa ou, se for maior, o desconto simplificado
+    mensal. Devolve, por mês, dedução, base, imposto, alíquota efetiva e imposto acumulado,
+    e os totais do ano.
+    """
+    receitas, despesas = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (receitas, despesas)))
+    if receitas.shape[-1:] != (12,):
+        raise ValueError("Receitas e despesas precisam de 12 meses na última dimensão")
+    tabela = tabela_ir(ano)
+
+    deducao = np.maximum(despesas, tabela.desconto_simplificado_mensal)
+    base = np.maximum(receitas - deducao, 0.0)
+    imposto = np.round(tabela.calcular(base), 2)
+    rendimento_anual = receitas.sum(axis=-1)
+    imposto_anual = imposto.sum(axis=-1)
+    return {
+        "receitas": receitas,
+        "despesas": despesas,
+        "deducao": deducao,
+        "base": base,
+        "imposto": imposto,
+        "aliquota": np.round(np.divide(imposto, receitas, out=np.zeros_like(receitas), where=receitas > 0) * 100, 2),
+        "imposto_acumulado": np.cumsum(imposto, axis=-1),
+        "rendimento_anual": rendimento_anual,
+        "imposto_anual": imposto_anual,
+        "aliquota_anual": np.divide(imposto_anual, rendimento_anual, out=np.zeros_like(rendimento_anual), where=rendimento_anual > 0) * 100,
+    }
+
+
+PERCENTIS = (5, 25, 50, 75, 95)
+
+
+def simular_monte_carlo(receitas, despesas, despesas_pessoais=0.0, trajetorias=10_000, metodo="bootstrap", semente=0, ano=None):
+    """Distribuição do IR anual e da economia como PJ sobre trajetórias de 12 meses sorteadas do histórico.
+
+    `receitas` e `despesas` são os meses observados (só os com receita entram no sorteio).
+    Com "bootstrap", cada mês da trajetória é um mês observado sorteado com reposição, com a
+    receita e a despesa daquele mês juntas. Com "lognormal", a receita vem de uma log-normal
+    ajustada aos meses observados e a despesa, da proporção despesa/receita de um mês sorteado.
+    Todas as trajetórias passam de uma vez pelo cálculo mensal do IR e pelo comparativo PF x PJ;
+    a mesma `semente` reproduz o mesmo resultado.
+    """
+    receitas = np.asarray(receitas, dtype=np.float64)
+    despesas = np.asarray(despesas, dtype=np.float64)
+    com_valor = np.flatnonzero(receitas > 0)
+    if com_valor.size == 0:
+        raise ValueError("Nenhum mês com receita para sortear")
+    aleatorio = np.random.default_rng(semente)
+
+    sorteados = aleatorio.choice(com_valor, size=(trajetorias, 12))
+    if metodo == "bootstrap":
+        receitas_sorteadas = receitas[sorteados]
+        despesas_sorteadas = despesas[sorteados]
+    elif metodo == "lognormal":
+        logs = np.log(receitas[com_valor])
+        receitas_sorteadas = np.exp(aleatorio.normal(logs.mean(), logs.std(), size=(trajetorias, 12)))
+        despesas_sorteadas = receitas_sorteadas * (despesas[sorteados] / receitas[sorteados])
+    else:
+        raise ValueError(f"Método desconhecido: {metodo!r} (opções: bootstrap, lognormal)")
+
+    projecao = projetar_ano(receitas_sorteadas, despesas_sorteadas, ano)
+    comparativo = comparar_pf_pj(receitas_sorteadas, despesas_sorteadas, despesas_pessoais, ano)
+    economia_pj = (comparativo["custo_total_pf"] - comparativo["custo_total_pj"]).sum(axis=-1)
+
+    return {
+        "percentis": np.array(PERCENTIS),
+        "imposto_anual": np.percentile(projecao["imposto_anual"], PERCENTIS),
+        "aliquota_anual": np.percentile(projecao["aliquota_anual"], PERCENTIS),
+        "economia_pj_anual": np.percentile(economia_pj, PERCENTIS),
+        "imposto_acumulado": np.percentile(projecao["imposto_acumulado"], PERCENTIS, axis=0),
+        "probabilidade_pj": float(np.mean(economia_pj > 0)),
+        "trajetorias": trajetorias,
+    }
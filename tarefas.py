@@ -0,0 +1,113 @@
+"""Fila de tarefas em segundo plano, no próprio processo, sem broker externo.
+
+A extração roda em um pool de threads limitado: o script do Streamlit envia a
+tarefa, recebe o id na hora e acompanha o progresso nos reruns, sem prender a
+sessão. O número de tarefas executando ao mesmo tempo e o de tarefas à espera
+são limitados, então uma rajada de envios não sobrecarrega o servidor.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from metricas import REGISTRO, iniciar_execucao
+
+MAX_TRABALHADORES = int(os.environ.get("CARNELEAO_TRABALHADORES", min(4, os.cpu_count() or 1)))
+MAX_PENDENTES = int(os.environ.get("CARNELEAO_MAX_PENDENTES", 32))
+
+
+class FilaCheia(RuntimeError):
+    pass
+
+
+@dataclass
+class Tarefa:
+    id: str
+    estado: str = "na_fila"
+    feito: int = 0
+    total: int = 0
+    resultado: object = None
+    erro: str | None = None
+    concluida_em: float | None = None
+    etapas: list = field(default_factory=list)
+    _fim: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def terminada(self):
+        return self.estado in ("concluida", "falhou")
+
+    @property
+    def fracao(self):
+        return min(self.feito / self.total, 1.0) if self.total else 0.0
+
+    def progresso(self, feito, total=None):
+        """Chamado pela própria tarefa para anotar quanto já foi feito."""
+        self.feito = feito
+        if total is not None:
+            self.total = total
+
+    def aguardar(self, timeout=None):
+        """Espera a tarefa terminar por até `timeout` segundos; devolve se terminou."""
+        return self._fim.wait(timeout)
+
+
+class FilaTarefas:
+    """Pool de threads com limite de tarefas simultâneas e de tarefas pendentes.
+
+    Cada tarefa é uma função `funcao(tarefa, *args)`; o retorno vira
+    `tarefa.resultado`. Tarefas terminadas ficam consultáveis por `ttl` segundos.
+    """
+
+    def __init__(self, max_trabalhadores=MAX_TRABALHADORES, max_pendentes=MAX_PENDENTES, ttl=600):
+        self.max_pendentes = max_pendentes
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_trabalhadores, thread_name_prefix="carneleao-tarefa")
+        self._tarefas = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, funcao, *args, chave=None, **kwargs):
+        """Enfileira a tarefa e devolve seu id; com `chave`, reaproveita a tarefa igual que não falhou."""
+        with self._lock:
+            self._descartar_expiradas()
+            existente = self._tarefas.get(chave)
+            if existente is not None and existente.estado != "falhou":
+                return existente.id
+            if sum(not tarefa.terminada for tarefa in self._tarefas.values()) >= self.max_pendentes:
+                raise FilaCheia(f"{self.max_pendentes} tarefas já aguardando processamento")
+            tarefa = Tarefa(id=chave or uuid.uuid4().hex)
+            self._tarefas[tarefa.id] = tarefa
+        self._executor.submit(self._executar, tarefa, funcao, args, kwargs)
+        return tarefa.id
+
+    def estado(self, id_tarefa):
+        with self._lock:
+            return self._tarefas.get(id_tarefa)
+
+    def pendentes(self):
+        with self._lock:
+            return sum(not tarefa.terminada for tarefa in self._tarefas.values())
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        tarefa.estado = "executando"
+        tarefa.etapas = iniciar_execucao()
+        try:
+            tarefa.resultado = funcao(tarefa, *args, **kwargs)
+            tarefa.estado = "concluida"
+        except Exception as e:
+            tarefa.erro = f"{type(e).__name__}: {e}"
+            tarefa.estado = "falhou"
+        finally:
+            tarefa.concluida_em = time.monotonic()
+            tarefa._fim.set()
+
+    def _descartar_expiradas(self):
+        limite = time.monotonic() - self.ttl
+        for id_tarefa in [i for i, t in self._tarefas.items() if t.concluida_em is not None and t.concluida_em < limite]:
+            del self._tarefas[id_tarefa]
+
+
+# Fila compartilhada por todas as sessões do servidor
+FILA = FilaTarefas()
+REGISTRO.medidor("carneleao_tarefas_pendentes", FILA.pendentes)
@@ -1,12 +1,13 @@
 import streamlit as st
-import pdfplumber
-import re
 import numpy as np
-import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 from PIL import Image
 import os
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from cache import CACHE_DEMONSTRATIVOS, CACHE_PROJECOES, hash_conteudo
+from demonstrativo import MESES, ler_demonstrativo
+from estaticos import formatar_reais
+from graficos import grafico_aliquota, grafico_comparativo, grafico_valores
+from simulacao import PERFIS_RECEITA, comparar_pf_pj, medias_mensais, projetar_ano, serie_mensal
 
 # === IDENTIDADE VISUAL ===
 COR_PRIMARIA = "#0b485a"
@@ -59,53 +60,80 @@ st.markdown("<hr style='border:1px solid #ccc'>", unsafe_allow_html=True)
 modo_simulacao = st.toggle("🔄 Modo Simular", help="Ative para simular manualmente sem importar PDF")
 
 # === UPLOAD PDF ===
-meses = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+meses = MESES
+dados_mensais = None
+# Identifica os dados exibidos nas chaves do cache de gráficos (hash do PDF ou da projeção)
+chave_dados = None
 if not modo_simulacao:
     arquivo = st.file_uploader("📄 Envie o demonstrativo em PDF", type=["pdf"])
+    if arquivo:
+        conteudo = arquivo.getvalue()
+        chave_dados = hash_conteudo(conteudo)
+        try:
+            dados_mensais = CACHE_DEMONSTRATIVOS.obter_ou_calcular(chave_dados, lambda: ler_demonstrativo(conteudo)).dados_mensais
+        except Exception as e:
+            st.error(f"Erro ao processar o PDF: {e}")
 
 if modo_simulacao:
-    iniciar_simulacao = st.button("📊 Gerar Relatório com Dados Simulados")
     st.markdown("### ✍️ Preencha os dados para simulação manual")
     receita_mensal_simulada = st.number_input("Faturamento médio mensal", min_value=0.0, step=100.0, format="%.2f")
     despesas_consultorio_simulada = st.number_input("Despesas mensais com consultório", min_value=0.0, step=50.0, format="%.2f")
-    # preenchimentos alternativos serão usados mais adiante se esse modo estiver ativo
-
-if modo_simulacao and 'iniciar_simulacao' in locals() and iniciar_simulacao:
+    col_perfil, col_crescimento = st.columns(2)
+    with col_perfil:
+        perfil = st.selectbox("Perfil da receita", list(PERFIS_RECEITA), format_func={"constante": "Constante", "ferias": "Com férias (jan/jul)"}.get)
+    with col_crescimento:
+        crescimento = st.number_input("Crescimento mensal (%)", min_value=-20.0, max_value=20.0, value=0.0, step=0.5, format="%.1f")
+
+    # Meses já realizados vêm de um demonstrativo parcial; só o resto do ano é projetado
+    parcial = st.file_uploader("📄 Demonstrativo parcial do ano (opcional)", type=["pdf"])
+    receitas_realizadas = despesas_realizadas = None
+    if parcial:
+        conteudo = parcial.getvalue()
+        try:
+            valores_realizados = CACHE_DEMONSTRATIVOS.obter_ou_calcular(hash_conteudo(conteudo), lambda: ler_demonstrativo(conteudo)).matriz()
+        except Exception as e:
+            st.error(f"Erro ao processar o PDF: {e}")
+            st.stop()
+        com_receita = np.flatnonzero(valores_realizados[0] > 0)
+        meses_realizados = st.slider("Meses realizados", 0, 12, int(com_receita[-1]) + 1 if com_receita.size else 0)
+        receitas_realizadas, despesas_realizadas = valores_realizados[:2, :meses_realizados]
+
+    # Sem valor informado, a projeção parte da média dos meses realizados
+    receitas_projetadas = serie_mensal(receita_mensal_simulada or None, perfil, crescimento / 100, receitas_realizadas)
+    despesas_projetadas = serie_mensal(despesas_consultorio_simulada or None, realizados=despesas_realizadas)
+    # Os 12 meses saem de uma só passada vetorizada, guardada por vetor de entrada
+    projecao = CACHE_PROJECOES.obter_ou_calcular(
+        (receitas_projetadas.tobytes(), despesas_projetadas.tobytes()),
+        lambda: projetar_ano(receitas_projetadas, despesas_projetadas),
+    )
+    if projecao["rendimento_anual"] > 0:
+        chave_dados = hash_conteudo(receitas_projetadas.tobytes() + despesas_projetadas.tobytes())
+        # "deducao" aqui são as despesas de consultório, como no demonstrativo, e é o que vai para o
+        # comparativo PF x PJ; a dedução usada no IR (com o desconto simplificado) fica só na tabela
+        dados_mensais = {
+            mes: {"rendimento": rendimento, "deducao": deducao, "imposto": imposto, "aliquota": aliquota}
+            for mes, rendimento, deducao, imposto, aliquota in zip(
+                meses,
+                projecao["receitas"].tolist(),
+                projecao["despesas"].tolist(),
+                projecao["imposto"].tolist(),
+                projecao["aliquota"].tolist(),
+            )
+        }
+        with st.expander("📅 Projeção mês a mês"):
+            st.dataframe({
+                "Mês": meses,
+                "Receita (R$)": projecao["receitas"],
+                "Despesas (R$)": projecao["despesas"],
+                "Dedução IR (R$)": projecao["deducao"],
+                "Base (R$)": projecao["base"],
+                "IR (R$)": projecao["imposto"],
+                "Alíquota (%)": projecao["aliquota"],
+                "IR acumulado (R$)": projecao["imposto_acumulado"],
+            }, hide_index=True)
+
+if dados_mensais is not None:
     try:
-        with pdfplumber.open(arquivo) as pdf:
-            texto = pdf.pages[0].extract_text()
-
-        dados_extraidos = {"nome": None, "cpf": None, "rendimentos_total": [], "deducao_considerada": [], "imposto_devido_I": []}
-
-        nome_match = re.search(r"NOME:\s+(.*?)\s+DEMONSTRATIVO", texto)
-        cpf_match = re.search(r"CPF:\s+([\d\.]+-\d+)", texto)
-        rendimentos_match = re.search(r"Total\s+([\d\.,\s]+)\s+Deduções", texto)
-        deducao_match = re.search(r"Dedução Considerada\s+([\d\.,\s]+)\s+Cálculo", texto)
-        imposto_match = re.search(r"Imposto Devido I\s+([\d\.,\s]+)\s+Imposto Pago", texto)
-
-        if nome_match: dados_extraidos["nome"] = nome_match.group(1)
-        if cpf_match: dados_extraidos["cpf"] = cpf_match.group(1)
-        if rendimentos_match:
-            dados_extraidos["rendimentos_total"] = [val.replace(".", "").replace(",", ".") for val in rendimentos_match.group(1).split()]
-        if deducao_match:
-            dados_extraidos["deducao_considerada"] = [val.replace(".", "").replace(",", ".") for val in deducao_match.group(1).split()]
-        if imposto_match:
-            dados_extraidos["imposto_devido_I"] = [val.replace(".", "").replace(",", ".") for val in imposto_match.group(1).split()]
-
-        dados_mensais = {}
-        for i in range(12):
-            rendimento = float(dados_extraidos["rendimentos_total"][i])
-            deducao = float(dados_extraidos["deducao_considerada"][i])
-            imposto = float(dados_extraidos["imposto_devido_I"][i])
-            aliquota = round((imposto / rendimento) * 100, 2) if rendimento > 0 else 0.0
-
-            dados_mensais[meses[i]] = {
-                "rendimento": rendimento,
-                "deducao": deducao,
-                "imposto": imposto,
-                "aliquota": aliquota
-            }
-
         st.markdown(f"<h3 style='color:{COR_PRIMARIA}; margin-bottom:0.5em;'>🗓️ Selecione os meses</h3>", unsafe_allow_html=True)
         meses_selecionados = st.multiselect("Meses:", meses, default=meses)
 
@@ -120,10 +148,10 @@ if modo_simulacao and 'iniciar_simulacao' in locals() and iniciar_simulacao:
 
         st.markdown(f"<h4 class='resumo-margin-top' style='color:{COR_PRIMARIA}'>📋 Resumo</h4>", unsafe_allow_html=True)
         col_a, col_b, col_c = st.columns(3)
-        valor_total_recebido = f"R$ {sum(rendimentos):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        valor_total_recebido = formatar_reais(sum(rendimentos))
         col_a.metric("Total Recebido", valor_total_recebido)
 
-        valor_total_impostos = f"R$ {sum(impostos):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        valor_total_impostos = formatar_reais(sum(impostos))
         col_b.metric("Total de Impostos", valor_total_impostos)
 
         valor_aliquota_media = f"{np.mean(aliquotas):.2f}".replace(".", ",") + "%"
@@ -133,26 +161,11 @@ if modo_simulacao and 'iniciar_simulacao' in locals() and iniciar_simulacao:
         col1, col2 = st.columns(2)
         with col1:
             st.markdown(f"<h4 style='color:{COR_PRIMARIA}'>📊 Comparativo de Valores</h4>", unsafe_allow_html=True)
-            fig_valores, ax = plt.subplots(figsize=(6, 3))
-            x = np.arange(len(meses_selecionados))
-            width = 0.25
-            ax.bar(x - width, rendimentos, width, label='Rendimento', color=COR_PRIMARIA)
-            ax.bar(x, deducoes, width, label='Deducao', color=COR_SECUNDARIA)
-            ax.bar(x + width, impostos, width, label='Imposto', color=COR_DESTAQUE)
-            ax.set_xticks(x)
-            ax.set_xticklabels(meses_selecionados)
-            ax.set_ylabel("R$")
-            ax.legend()
-            st.pyplot(fig_valores)
+            st.image(grafico_valores(chave_dados, meses_selecionados, rendimentos, deducoes, impostos), width="stretch")
 
         with col2:
             st.markdown(f"<h4 style='color:{COR_PRIMARIA}'>📈 Evolução da Alíquota</h4>", unsafe_allow_html=True)
-            fig_aliquota, ax2 = plt.subplots(figsize=(6, 3))
-            ax2.plot(meses_selecionados, aliquotas, marker='o', color=COR_DESTAQUE)
-            ax2.set_ylim(0, max(aliquotas + [20]) + 2)
-            ax2.set_ylabel("%")
-            ax2.grid(True)
-            st.pyplot(fig_aliquota)
+            st.image(grafico_aliquota(chave_dados, meses_selecionados, aliquotas), width="stretch")
 
         st.markdown(f"<h4 style='color:{COR_PRIMARIA}'>🚦 Alíquota Efetiva Média</h4>", unsafe_allow_html=True)
         media_aliquota = round(np.mean(aliquotas), 2)
@@ -194,153 +207,31 @@ if modo_simulacao and 'iniciar_simulacao' in locals() and iniciar_simulacao:
                 outros_saude = st.number_input("Outros gastos com saúde (R$/mês)", min_value=0.0, format="%.2f")
 
             if st.button("Calcular Comparativo PF vs PJ"):
-                if modo_simulacao:
-                    receita_mensal = receita_mensal_simulada
-                    despesas_consultorio = despesas_consultorio_simulada
-                    impostos_simulados = []
-                    aliquotas_simuladas = []
-                    desconto_padrao = 564.80
-                    for _ in range(12):
-                        deducao_utilizada = max(despesas_consultorio, desconto_padrao)
-                        base_ir_mensal = receita_mensal - deducao_utilizada
-                        if base_ir_mensal <= 2259.20:
-                            imposto = 0
-                        elif base_ir_mensal <= 2826.65:
-                            imposto = base_ir_mensal * 0.075 - 169.44
-                        elif base_ir_mensal <= 3751.05:
-                            imposto = base_ir_mensal * 0.15 - 381.44
-                        elif base_ir_mensal <= 4664.68:
-                            imposto = base_ir_mensal * 0.225 - 662.77
-                        else:
-                            imposto = base_ir_mensal * 0.275 - 896.00
-                        imposto = max(imposto, 0)
-                        impostos_simulados.append(imposto)
-                        aliquotas_simuladas.append(round((imposto / receita_mensal) * 100, 2))
-                    rendimentos = [receita_mensal] * 12
-                    deducoes = [despesas_consultorio] * 12
-                    impostos = impostos_simulados
-                    aliquotas = aliquotas_simuladas
-                else:
-                    receita_mensal = sum(rendimentos) / len([v for v in rendimentos if v > 0])
-                    despesas_consultorio = sum(deducoes) / len([v for v in deducoes if v > 0])
-                despesas_consultorio = sum(deducoes) / len([v for v in deducoes if v > 0])
+                receita_mensal = float(medias_mensais(rendimentos))
+                despesas_consultorio = float(medias_mensais(deducoes))
                 despesas_pessoais = gasto_terapia + plano_saude + outros_saude
 
-                # Custo PF
-                contabilidade_pf = 289.00
-                inss_pf = 166.98  # fixo
-                base_completa = receita_mensal - despesas_consultorio - despesas_pessoais
-                base_completa = max(base_completa, 0)
-                ir_completa = 0
-                if base_completa <= 2259.20:
-                    ir_completa = 0
-                elif base_completa <= 2826.65:
-                    ir_completa = base_completa * 0.075 - 169.44
-                elif base_completa <= 3751.05:
-                    ir_completa = base_completa * 0.15 - 381.44
-                elif base_completa <= 4664.68:
-                    ir_completa = base_completa * 0.225 - 662.77
-                else:
-                    ir_completa = base_completa * 0.275 - 896.00
-                ir_completa = max(ir_completa, 0)
-                custo_total_pf_completa = contabilidade_pf + inss_pf + ir_completa
-
-                deducao_simplificada = min(receita_mensal * 0.2, 16754.34 / 12)
-                base_simplificada = receita_mensal - deducao_simplificada
-                base_simplificada = max(base_simplificada, 0)
-                ir_simplificada = 0
-                if base_simplificada <= 2259.20:
-                    ir_simplificada = 0
-                elif base_simplificada <= 2826.65:
-                    ir_simplificada = base_simplificada * 0.075 - 169.44
-                elif base_simplificada <= 3751.05:
-                    ir_simplificada = base_simplificada * 0.15 - 381.44
-                elif base_simplificada <= 4664.68:
-                    ir_simplificada = base_simplificada * 0.225 - 662.77
-                else:
-                    ir_simplificada = base_simplificada * 0.275 - 896.00
-                ir_simplificada = max(ir_simplificada, 0)
-                custo_total_pf_simplificada = contabilidade_pf + inss_pf + ir_simplificada
-
-                if custo_total_pf_completa < custo_total_pf_simplificada:
-                    custo_total_pf = custo_total_pf_completa
-                    tipo_pf = "Completa"
-                else:
-                    custo_total_pf = custo_total_pf_simplificada
-                    tipo_pf = "Simplificada"
-
-                if receita_mensal <= 15000:
-                    simples_pj = receita_mensal * 0.06
-                elif receita_mensal <= 20000:
-                    simples_pj = receita_mensal * 0.07
-                else:
-                    simples_pj = receita_mensal * 0.08
-
-                prolabore = max(1518.00, receita_mensal * 0.28)
-                inss_prolabore = prolabore * 0.11
-                base_ir_prolabore = prolabore - inss_prolabore
-
-                if base_ir_prolabore <= 2259.20:
-                    irrf_prolabore = 0
-                elif base_ir_prolabore <= 2826.65:
-                    irrf_prolabore = base_ir_prolabore * 0.075 - 169.44
-                elif base_ir_prolabore <= 3751.05:
-                    irrf_prolabore = base_ir_prolabore * 0.15 - 381.44
-                elif base_ir_prolabore <= 4664.68:
-                    irrf_prolabore = base_ir_prolabore * 0.225 - 662.77
-                else:
-                    irrf_prolabore = base_ir_prolabore * 0.275 - 896.00
-                irrf_prolabore = max(irrf_prolabore, 0)
-
-                # Restituição do IR do Pro Labore
-                # Determinar dedução da PJ com base em despesas pessoais vs. teto simplificado
-                if despesas_pessoais > 1396.20:
-                    tipo_deducao_pj = "Completa"
-                else:
-                    tipo_deducao_pj = "Simplificada"
-
-                if tipo_deducao_pj == "Completa":
-                    base_restituicao = base_ir_prolabore - despesas_pessoais
-                else:
-                    base_restituicao = prolabore * 0.8
-
-                if base_restituicao <= 2259.20:
-                    ir_restituir = 0
-                elif base_restituicao <= 2826.65:
-                    ir_restituir = base_restituicao * 0.075 - 169.44
-                elif base_restituicao <= 3751.05:
-                    ir_restituir = base_restituicao * 0.15 - 381.44
-                elif base_restituicao <= 4664.68:
-                    ir_restituir = base_restituicao * 0.225 - 662.77
-                else:
-                    ir_restituir = base_restituicao * 0.275 - 896.00
-                ir_restituir = max(ir_restituir, 0)
-
-                contabilidade_pj = 489.00
-                taxas_pj = 50.00
-                custo_total_pj = simples_pj + inss_prolabore + irrf_prolabore + contabilidade_pj + taxas_pj - (irrf_prolabore - ir_restituir)
+                comparativo = comparar_pf_pj(receita_mensal, despesas_consultorio, despesas_pessoais)
+                custo_total_pf = comparativo["custo_total_pf"]
+                custo_total_pj = comparativo["custo_total_pj"]
 
                 st.markdown("## 💰 Resultado da Simulação")
                 col_pf, col_pj = st.columns(2)
                 with col_pf:
-                    st.metric("Custo Anual PF", f"R$ {custo_total_pf * 12:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
-                    st.caption(f"Custo mensal: R$ {custo_total_pf:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
+                    st.metric("Custo Anual PF", formatar_reais(custo_total_pf * 12))
+                    st.caption(f"Custo mensal: {formatar_reais(custo_total_pf)}")
                 with col_pj:
-                    st.metric("Custo Anual PJ", f"R$ {custo_total_pj * 12:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
-                    st.caption(f"Custo mensal: R$ {custo_total_pj:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
+                    st.metric("Custo Anual PJ", formatar_reais(custo_total_pj * 12))
+                    st.caption(f"Custo mensal: {formatar_reais(custo_total_pj)}")
 
-                economia = (custo_total_pf - custo_total_pj) * 12
+                economia = comparativo["economia_anual"]
                 if economia > 0:
                     st.success(f"💡 Migrar para PJ gera economia estimada de R$ {economia:,.2f} por ano")
                 else:
                     st.info(f"🤔 No cenário atual, PF ainda é mais vantajoso em cerca de R$ {abs(economia):,.2f} ao ano")
 
                 st.markdown("### 📊 Comparativo Visual")
-                fig_comp = plt.figure(figsize=(6,3))
-                plt.bar(["PF"], [custo_total_pf * 12], color=COR_PRIMARIA)
-                plt.bar(["PJ"], [custo_total_pj * 12], color=COR_SECUNDARIA)
-                plt.ylabel("Custo Anual (R$)")
-                st.pyplot(fig_comp)
+                st.image(grafico_comparativo(custo_total_pf * 12, custo_total_pj * 12), width="stretch")
 
                 # Debug: Exibir variáveis e fórmulas
                 # st.markdown("### 🧾 Variáveis e Fórmulas utilizadas")
@@ -348,20 +239,19 @@ if modo_simulacao and 'iniciar_simulacao' in locals() and iniciar_simulacao:
                 st.markdown(f"**Despesas consultório médias:** R$ {despesas_consultorio:.2f}")
                 st.markdown(f"**Despesas pessoais:** R$ {despesas_pessoais:.2f}")
 
-                deducao_completa = despesas_consultorio + despesas_pessoais + contabilidade_pf + inss_pf
-                st.markdown(f"**Dedução completa:** R$ {deducao_completa:.2f}")
-                st.markdown(f"**Dedução simplificada:** R$ {deducao_simplificada:.2f}")
-                st.markdown(f"**Base IR completa:** receita - dedução completa = R$ {base_completa:.2f}")
-                st.markdown(f"**IR completa:** R$ {ir_completa:.2f}")
-                st.markdown(f"**Base IR simplificada:** receita - dedução simplificada = R$ {base_simplificada:.2f}")
-                st.markdown(f"**IR simplificada:** R$ {ir_simplificada:.2f}")
+                st.markdown(f"**Dedução completa:** R$ {comparativo['deducao_completa']:.2f}")
+                st.markdown(f"**Dedução simplificada:** R$ {comparativo['deducao_simplificada']:.2f}")
+                st.markdown(f"**Base IR completa:** receita - dedução completa = R$ {comparativo['base_completa']:.2f}")
+                st.markdown(f"**IR completa:** R$ {comparativo['ir_completa']:.2f}")
+                st.markdown(f"**Base IR simplificada:** receita - dedução simplificada = R$ {comparativo['base_simplificada']:.2f}")
+                st.markdown(f"**IR simplificada:** R$ {comparativo['ir_simplificada']:.2f}")
                 st.markdown("---")
-                st.markdown(f"**Simples Nacional:** R$ {simples_pj:.2f}")
-                st.markdown(f"**Pró-labore:** R$ {prolabore:.2f}")
-                st.markdown(f"**INSS sobre pró-labore:** R$ {inss_prolabore:.2f}")
-                st.markdown(f"**Base IRRF pró-labore:** R$ {base_ir_prolabore:.2f}")
-                st.markdown(f"**IRRF sobre pró-labore:** R$ {irrf_prolabore:.2f}")
-                st.markdown(f"**Restituição IR pró-labore:** R$ {ir_restituir:.2f}")
+                st.markdown(f"**Simples Nacional:** R$ {comparativo['simples_pj']:.2f}")
+                st.markdown(f"**Pró-labore:** R$ {comparativo['prolabore']:.2f}")
+                st.markdown(f"**INSS sobre pró-labore:** R$ {comparativo['inss_prolabore']:.2f}")
+                st.markdown(f"**Base IRRF pró-labore:** R$ {comparativo['base_ir_prolabore']:.2f}")
+                st.markdown(f"**IRRF sobre pró-labore:** R$ {comparativo['irrf_prolabore']:.2f}")
+                st.markdown(f"**Restituição IR pró-labore:** R$ {comparativo['ir_restituir']:.2f}")
                 st.markdown(f"**Total PJ:** R$ {custo_total_pj:.2f}")
 
 
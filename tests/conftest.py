@@ -0,0 +1,6 @@
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Os módulos ficam na raiz do repositório; o gerador de demonstrativos, em benchmarks/
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, "benchmarks")]
@@ -0,0 +1,49 @@
+"""Paridade dos motores de extração: pdfminer e pdfium devem ler o mesmo que o pdfplumber.
+
+Os demonstrativos são gerados por benchmarks/gerador.py, de um e de duas páginas
+(com duas, cada linha de valores quebra entre Jan a Jun e Jul a Dez).
+"""
+import numpy as np
+import pytest
+
+from demonstrativo import ler_demonstrativo
+from gerador import gerar_pasta
+from lote import comparar_motores
+
+MOTORES_RAPIDOS = ("pdfminer", "pdfium")
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("demonstrativos")
+    esperados = gerar_pasta(pasta / "uma_pagina", 4, ano=2024)
+    esperados.update(gerar_pasta(pasta / "duas_paginas", 4, ano=2023, paginas=2, semente_inicial=100))
+    return esperados
+
+
+@pytest.fixture(scope="module")
+def referencia(corpus):
+    return {caminho: ler_demonstrativo(caminho, "pdfplumber") for caminho in corpus}
+
+
+def test_referencia_le_os_valores_gerados(corpus, referencia):
+    for caminho, esperado in corpus.items():
+        demonstrativo = referencia[caminho]
+        assert (demonstrativo.nome, demonstrativo.cpf, demonstrativo.ano) == (esperado["nome"], esperado["cpf"], esperado["ano"])
+        assert demonstrativo.totais() == esperado["totais"]
+
+
+@pytest.mark.parametrize("motor", MOTORES_RAPIDOS)
+def test_motor_igual_ao_pdfplumber(motor, corpus, referencia):
+    for caminho in corpus:
+        demonstrativo = ler_demonstrativo(caminho, motor)
+        esperado = referencia[caminho]
+        assert (demonstrativo.nome, demonstrativo.cpf, demonstrativo.ano) == (esperado.nome, esperado.cpf, esperado.ano), caminho
+        np.testing.assert_array_equal(demonstrativo.valores, esperado.valores, err_msg=caminho)
+        assert demonstrativo.totais() == esperado.totais(), caminho
+
+
+@pytest.mark.parametrize("motor", MOTORES_RAPIDOS)
+def test_comparar_motores_sem_divergencias(motor, corpus):
+    caminho = next(c for c in corpus if "duas_paginas" in c)
+    assert comparar_motores(caminho, motor) == (caminho, [])
@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class TabelaIR:
+    """Tabela progressiva mensal do IRPF de um ano-calendário.
+
+    `limites` são os tetos das faixas (a última faixa não tem teto); `aliquotas`
+    e `parcelas_deduzir` têm uma posição a mais que `limites`.
+    """
+    ano: int
+    limites: np.ndarray
+    aliquotas: np.ndarray
+    parcelas_deduzir: np.ndarray
+    desconto_simplificado_mensal: float
+    limite_desconto_simplificado_anual: float = 16754.34
+
+    def calcular(self, base):
+        """IR devido sobre `base` (escalar ou array de qualquer formato)."""
+        base = np.asarray(base, dtype=np.float64)
+        faixa = np.searchsorted(self.limites, base, side="left")
+        imposto = np.maximum(base * self.aliquotas[faixa] - self.parcelas_deduzir[faixa], 0.0)
+        return float(imposto) if imposto.ndim == 0 else imposto
+
+
+def _tabela(ano, limites, parcelas_deduzir, desconto_simplificado_mensal):
+    return TabelaIR(
+        ano=ano,
+        limites=np.array(limites),
+        aliquotas=np.array([0.0, 0.075, 0.15, 0.225, 0.275]),
+        parcelas_deduzir=np.array([0.0, *parcelas_deduzir]),
+        desconto_simplificado_mensal=desconto_simplificado_mensal,
+    )
+
+
+# Tabela em vigor no fim de cada ano-calendário. A de 2022 vale de 2015 a abril de 2023,
+# antes do desconto simplificado mensal
+TABELAS_IR = {
+    2022: _tabela(2022, [1903.98, 2826.65, 3751.05, 4664.68], [142.80, 354.80, 636.13, 869.36], 0.0),
+    2023: _tabela(2023, [2112.00, 2826.65, 3751.05, 4664.68], [158.40, 370.40, 651.73, 884.96], 528.00),
+    2024: _tabela(2024, [2259.20, 2826.65, 3751.05, 4664.68], [169.44, 381.44, 662.77, 896.00], 564.80),
+    2025: _tabela(2025, [2428.80, 2826.65, 3751.05, 4664.68], [182.16, 394.16, 675.49, 908.73], 607.20),
+}
+ANO_PADRAO = 2024
+
+
+def tabela_ir(ano=None):
+    ano = ano or ANO_PADRAO
+    if ano not in TABELAS_IR:
+        raise ValueError(f"Sem tabela do IR para {ano} (disponíveis: {', '.join(map(str, TABELAS_IR))})")
+    return TABELAS_IR[ano]
+
+
+def calcular_ir(base, ano=None):
+    """IR mensal pela tabela progressiva; aceita escalar ou array (ex.: clientes x meses)."""
+    return tabela_ir(ano).calcular(base)
+
+
+# Simples Nacional: alíquota efetiva aproximada por faixa de receita mensal. Com
+# Fator R (folha >= 28% da receita) a atividade fica no Anexo III; abaixo, no Anexo V.
+LIMITES_SIMPLES = np.array([15000.00, 20000.00])
+ALIQUOTAS_SIMPLES = {
+    "III": np.array([0.06, 0.07, 0.08]),
+    "V": np.array([0.155, 0.16, 0.17]),
+}
+
+
+def calcular_simples(receita_mensal, anexo="III"):
+    """DAS mensal do Simples Nacional; aceita escalar ou array."""
+    receita_mensal = np.asarray(receita_mensal, dtype=np.float64)
+    faixa = np.searchsorted(LIMITES_SIMPLES, receita_mensal, side="left")
+    simples = receita_mensal * ALIQUOTAS_SIMPLES[anexo][faixa]
+    return float(simples) if simples.ndim == 0 else simples